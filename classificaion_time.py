@@ -3,6 +3,8 @@ from datetime import datetime, timedelta
 import os
 from scripts.predict import predict
 from scripts.update_data import update_binance_ohlcv
+from scripts.features import FeatureEngine
+from scripts.market_data import MarketData
 
 # ====== CONFIGURACIÓN ======
 TIMEFRAMES = ["1m", "3m", "5m", "15m", "1h", "1d"]
@@ -13,23 +15,15 @@ RESULTS_PATH = "results/classification_log.csv"
 for tf in TIMEFRAMES:
     update_binance_ohlcv(SYMBOL, tf)
 
-df_data = {tf: pd.read_csv(f"data/historical_data/PEPEUSDT_{tf}.csv") for tf in TIMEFRAMES}
-for df in df_data.values():
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
+market = MarketData.load(SYMBOL, TIMEFRAMES)
+df_data = market.frames
+
+# Features calculadas una sola vez por timeframe; cada consulta lee la foto as-of
+engines = {tf: FeatureEngine.from_frame(df) for tf, df in df_data.items()}
 
 model_paths = {tf: f"models/ppo_predictor_{tf}" for tf in TIMEFRAMES}
 
 # ====== FUNCIONES ======
-def prepare_data(df):
-    df = df.copy()
-    df["close"] = df["close"].astype(float)
-    df["return"] = df["close"].pct_change().fillna(0)
-    df["volume"] = df["volume"].astype(float)
-    df["ema_9"] = df["close"].ewm(span=9).mean()
-    df["ema_21"] = df["close"].ewm(span=21).mean()
-    df["ema_trend_up"] = (df["ema_9"] > df["ema_21"]).astype(int)
-    return df[["return", "volume", "ema_9", "ema_21", "ema_trend_up"]]
-
 def classify(preds):
     order = sorted(range(len(preds)), key=lambda i: preds[i])
     pattern_dict = {
@@ -78,22 +72,18 @@ while True:
     }
 
     for tf in TIMEFRAMES:
-        df = df_data[tf]
-        subset = df[df["timestamp"] <= utc_time]
+        engine = engines[tf]
+        n_rows = engine.index_asof(utc_time)
 
-        if len(subset) < 15:
+        if n_rows < 15:
             print(f"{tf.upper()}: ❌ No hay suficientes datos")
             row[f"{tf}_pattern"] = "No data"
             row[f"{tf}_close"] = "N/A"
             continue
 
-        input_df = prepare_data(subset)
+        input_df = engine.features_asof(utc_time, 20)
         preds = predict(input_df, model_paths[tf], return_only=True)
-
-        try:
-            close_price = subset.iloc[-1]["close"]
-        except:
-            close_price = "N/A"
+        close_price = engine.close[n_rows - 1]
 
         if len(preds) >= 3:
             pattern = classify(preds[:3])
@@ -1,12 +1,23 @@
 import gymnasium as gym
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from env.observations import volume_stats
+
+STATS_CHUNK = 65536  # Ventanas por bloque al precalcular las estadísticas del volumen
+
 
 class CandlePredictionEnv(gym.Env):
-    def __init__(self, data, predict_steps=3):
+    def __init__(self, data, predict_steps=3, start_position=10, random_start=False):
         super(CandlePredictionEnv, self).__init__()
-        self.data = data.reset_index(drop=True)
+        # Sin reset_index ni copias: sólo se leen arrays posicionales del DataFrame
+        self.data = data
+        self.n_rows = len(data)
         self.predict_steps = predict_steps
-        self.position = 10
+        # Posición desde la que arranca cada episodio; con random_start, cada
+        # reset sortea una en [start_position, última posición con paso válido]
+        self.start_position = max(start_position, 10)
+        self.random_start = random_start
+        self.position = self.start_position
 
         # Observación: últimas 10 velas
         # Determinar dinámicamente cuántas features hay por paso
@@ -22,36 +33,76 @@ class CandlePredictionEnv(gym.Env):
             low=-1, high=1, shape=(self.predict_steps,), dtype=np.float32
         )
 
+        # Ventanas como vista sobre la matriz de features + estadísticas del volumen
+        self._returns = data["return"].to_numpy() if "return" in data.columns else None
+        self._build_windows()
+
+    def _build_windows(self):
+        """
+        Ventanas deslizantes (n_ventanas, n_features, window_size) como vista
+        de solo lectura sobre la matriz float32 de features (sin copia), más la
+        media y el desvío del volumen de cada ventana (8 bytes por vela). La
+        ventana k es la observación para position = k + window_size; el volumen
+        se normaliza recién al armar cada observación.
+        """
+        # Con la matriz canónica float32 de prepare_data esto es una vista (sin copia)
+        values = self.data.to_numpy(dtype=np.float32)
+        n_windows = max(len(values) - self.window_size + 1, 0)
+        self._windows = sliding_window_view(values, self.window_size, axis=0)[:n_windows]
+
+        self._vol_index = self.feature_columns.index("volume") if "volume" in self.feature_columns else None
+        if self._vol_index is None:
+            return
+        self._vol_mean = np.empty((n_windows, 1), dtype=np.float32)
+        self._vol_scale = np.empty((n_windows, 1), dtype=np.float32)
+        for i in range(0, n_windows, STATS_CHUNK):
+            # Copia contigua por bloques: mismas operaciones que windows_to_observations
+            vol = np.ascontiguousarray(self._windows[i:i + STATS_CHUNK, self._vol_index, :])
+            self._vol_mean[i:i + STATS_CHUNK], self._vol_scale[i:i + STATS_CHUNK] = volume_stats(vol)
+
+    def _observations(self, k):
+        """Observaciones (len(k), obs_len) de las ventanas k (array de índices)."""
+        windows = self._windows[k]  # Copia (len(k), n_features, window_size) contigua
+        if self._vol_index is not None:
+            j = self._vol_index
+            windows[:, j, :] = (windows[:, j, :] - self._vol_mean[k]) / self._vol_scale[k]
+        return windows.reshape(len(k), self.obs_len)
+
     def seed(self, seed=None):
         self.np_random, seed = gym.utils.seeding.np_random(seed)
         return [seed]
 
     def reset(self, *, seed=None, options=None):
         super().reset(seed=seed)
-        self.position = 10
+        last_start = self.n_rows - self.predict_steps - 1
+        if self.random_start and last_start > self.start_position:
+            self.position = int(self.np_random.integers(self.start_position, last_start + 1))
+        else:
+            self.position = self.start_position
         obs = self._get_obs()
-        return obs, {} 
+        return obs, {}
 
 
     def _get_obs(self):
-        recent_data = self.data.iloc[self.position - self.window_size:self.position]
-        obs_parts = []
-
-        for col in self.feature_columns:
-            series = recent_data[col].values.astype("float32")
-
-            # Normalizar volumen
-            if col == "volume":
-                series = (series - series.mean()) / (series.std() + 1e-6)
-
-            # No tocar ema_trend_up ni otras binarias
-            obs_parts.append(series)
-
-        obs = np.concatenate(obs_parts).astype("float32")
-        return obs
+        # Una sola ventana copiada de la vista (obs_len floats) y con el volumen normalizado
+        if self.position < self.window_size:
+            raise ValueError(f"❌ Posición {self.position} sin ventana completa de {self.window_size} velas")
+        k = self.position - self.window_size
+        window = self._windows[k].copy()
+        if self._vol_index is not None:
+            j = self._vol_index
+            window[j] = (window[j] - self._vol_mean[k]) / self._vol_scale[k]
+        return window.reshape(self.obs_len)
+
+    def get_obs_batch(self, positions):
+        """Matriz (len(positions), obs_len) con las observaciones de varias posiciones."""
+        positions = np.asarray(positions)
+        if positions.size and positions.min() < self.window_size:
+            raise ValueError(f"❌ Posiciones sin ventana completa de {self.window_size} velas")
+        return self._observations(positions - self.window_size)
 
     def step(self, action):
-        future_returns = self.data.iloc[self.position:self.position + self.predict_steps]["return"].values
+        future_returns = self._returns[self.position:self.position + self.predict_steps]
         action = np.clip(action, -1, 1)
 
         # Error cuadrático inverso como recompensa
@@ -59,7 +110,7 @@ class CandlePredictionEnv(gym.Env):
         reward = -mse
 
         self.position += 1
-        done = self.position + self.predict_steps >= len(self.data)
+        done = self.position + self.predict_steps >= self.n_rows
 
         terminated = done
         truncated = False
@@ -0,0 +1,3 @@
+def volume_stats(vol):
+    """Media y desvío (+1e-6) del volumen de cada ventana: vol (n, window_size) float32 -> (n, 1), (n, 1)."""
+    return vol.mean(axis=1, keepdims=True), vol.std(axis=1, keepdims=True) + 1e-6
@@ -1,87 +1,70 @@
 import tkinter as tk
 from tkinter import ttk
-import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from datetime import datetime, timedelta
-from scripts.predict import predict
-from scripts.update_data import update_binance_ohlcv
+from scripts.features import FeatureEngine
+from scripts.market_data import MarketData
+from scripts.timeline import PredictionTimeline
+from scripts.plot_view import PlotView, repeat_button
 
 # =================== CONFIGURACION ===================
+# Sin descargas al abrir: los datos se actualizan con `python main.py gui clasificacion --update`
 TIMEFRAMES = ["1m", "3m", "5m", "15m", "1h", "1d"]
-for tf in TIMEFRAMES:
-    update_binance_ohlcv("PEPE/USDT", tf)
 
-df_data = {tf: pd.read_csv(f"data/historical_data/PEPEUSDT_{tf}.csv") for tf in TIMEFRAMES}
-for df in df_data.values():
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
+market = MarketData.load("PEPE/USDT", TIMEFRAMES)
+df_data = market.frames
+engines = {tf: FeatureEngine.from_frame(df) for tf, df in df_data.items()}
 
 model_paths = {tf: f"models/ppo_predictor_{tf}" for tf in TIMEFRAMES}
 step_index = 0
 window_minutes = 100
+prefetch_minutes = 1440  # Se precalcula un día hacia cada lado de la vista
 
-# =================== FUNCIONES ===================
-def prepare_data(df):
-    df = df.copy()
-    df["close"] = df["close"].astype(float)
-    df["return"] = df["close"].pct_change().fillna(0)
-    df["volume"] = df["volume"].astype(float)
-    df["ema_9"] = df["close"].ewm(span=9).mean()
-    df["ema_21"] = df["close"].ewm(span=21).mean()
-    df["ema_trend_up"] = (df["ema_9"] > df["ema_21"]).astype(int)
-    return df[["return", "volume", "ema_9", "ema_21", "ema_trend_up"]]
-
-def classify(preds):
-    order = sorted(range(len(preds)), key=lambda i: preds[i])
-    pattern = tuple(order)
-    pattern_dict = {
-        (0,1,2): 1,
-        (0,2,1): 2,
-        (1,0,2): 3,
-        (1,2,0): 4,
-        (2,0,1): 5,
-        (2,1,0): 6
-    }
-    return pattern_dict.get(pattern, 0)
+# Predicciones y patrones calculados en segundo plano y cacheados
+timeline = PredictionTimeline(engines, model_paths)
 
+# =================== FUNCIONES ===================
 def update_plot():
     global step_index
 
     end_time = df_data["1m"]["timestamp"].iloc[-1] + timedelta(minutes=step_index)
     start_time = end_time - timedelta(minutes=window_minutes)
 
-    fig.clear()
-    ax = fig.add_subplot(111)
-    frame = df_data["1m"]
-    data = frame[(frame["timestamp"] >= start_time) & (frame["timestamp"] <= end_time)].copy()
-    data["timestamp_local"] = data["timestamp"] - timedelta(hours=3)
-    ax.plot(data["timestamp_local"], data["close"], label="Precio 1m", color="black")
+    data = market.range("1m", start_time, end_time)
+    view.set_line("price", data["timestamp"] - timedelta(hours=3), data["close"])
 
     # Mostrar 60 minutos reales futuros si no estamos en el último minuto
-    last_time = df_data["1m"]["timestamp"].iloc[-1]
-    if end_time < last_time:
-        future_data = frame[(frame["timestamp"] > end_time) & (frame["timestamp"] <= end_time + timedelta(minutes=60))].copy()
-        if not future_data.empty:
-            future_data["timestamp_local"] = future_data["timestamp"] - timedelta(hours=3)
-            ax.plot(future_data["timestamp_local"], future_data["close"], label="Real futuro", color="green", linestyle="--")
+    # (vacío en el último minuto: la línea se oculta)
+    future_data = market.range("1m", end_time, end_time + timedelta(minutes=60), closed="right")
+    view.set_line("future", future_data["timestamp"] - timedelta(hours=3), future_data["close"])
 
     classification_text.delete("1.0", tk.END)
     local_time = end_time - timedelta(hours=3)
     classification_text.insert(tk.END, f"Predicciones al minuto: {local_time.strftime('%Y-%m-%d %H:%M')}\n\n")
 
+    missing = []
     for tf in TIMEFRAMES:
-        df_tf = df_data[tf]
-        subset = df_tf[df_tf["timestamp"] <= end_time]
-        input_df = prepare_data(subset)
-        if len(input_df) >= 10:
-            preds = predict(input_df, model_paths[tf], return_only=True)
-            if len(preds) >= 3:
-                pattern_id = classify(preds[:3])
-                classification_text.insert(tk.END, f"{tf.upper()}: Patrón {pattern_id}\n")
-
-    ax.set_title(f"PEPEUSDT 1m hasta {local_time.strftime('%Y-%m-%d %H:%M')}")
-    ax.grid()
-    canvas.draw()
+        engine = engines[tf]
+        n_rows = engine.index_asof(end_time)
+        _, patterns, tf_missing = timeline.lookup(tf, [n_rows])
+        missing += tf_missing
+        if tf_missing:
+            classification_text.insert(tk.END, f"{tf.upper()}: calculando...\n")
+        elif n_rows >= 20:
+            classification_text.insert(tk.END, f"{tf.upper()}: Patrón {patterns[0]}\n")
+
+        # Prefetch de las regiones vecinas (navegación sin esperas)
+        timeline.prefetch(
+            tf,
+            engine.index_asof(end_time - timedelta(minutes=prefetch_minutes)),
+            engine.index_asof(end_time + timedelta(minutes=prefetch_minutes)),
+        )
+
+    if missing:
+        timeline.when_ready(root, missing, update_plot)
+
+    view.update(f"PEPEUSDT 1m hasta {local_time.strftime('%Y-%m-%d %H:%M')}")
 
 # =================== NAVEGACION ===================
 def move(minutes):
@@ -89,7 +72,8 @@ def move(minutes):
     step_index += minutes
     if step_index > 0:
         step_index = 0
-    update_plot()
+    # Clicks seguidos se juntan en un solo redibujo con el step_index final
+    view.request(root, update_plot)
 
 def go_back(): move(-1)
 def go_forward(): move(1)
@@ -115,6 +99,11 @@ fig = plt.Figure(figsize=(10, 5))
 canvas = FigureCanvasTkAgg(fig, master=plot_frame)
 canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
+# Artistas creados una sola vez: cada paso sólo actualiza sus datos
+view = PlotView(fig, canvas, legend=False)
+view.line("price", label="Precio 1m", color="black")
+view.line("future", label="Real futuro", color="green", linestyle="--")
+
 info_frame = ttk.Frame(main_frame, width=200)
 info_frame.pack(side=tk.RIGHT, fill=tk.Y)
 
@@ -124,10 +113,10 @@ classification_text.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 btn_frame = ttk.Frame(root)
 btn_frame.pack(side=tk.BOTTOM, pady=10)
 
-btn_back = ttk.Button(btn_frame, text="<- Anterior", command=go_back)
+btn_back = repeat_button(btn_frame, "<- Anterior", go_back)  # Mantener apretado = avanzar de a 1 min
 btn_back.grid(row=0, column=0, padx=5)
 
-btn_forward = ttk.Button(btn_frame, text="Siguiente ->", command=go_forward)
+btn_forward = repeat_button(btn_frame, "Siguiente ->", go_forward)
 btn_forward.grid(row=0, column=1, padx=5)
 
 btn_back_30 = ttk.Button(btn_frame, text="<- 30 min", command=back_30min)
@@ -148,5 +137,8 @@ btn_back_1d.grid(row=0, column=6, padx=5)
 btn_forward_1d = ttk.Button(btn_frame, text="1 d ->", command=forward_1d)
 btn_forward_1d.grid(row=0, column=7, padx=5)
 
+root.bind("<Left>", lambda e: go_back())
+root.bind("<Right>", lambda e: go_forward())
+
 update_plot()
 root.mainloop()
@@ -1,79 +1,77 @@
 import tkinter as tk
 from tkinter import ttk
-import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from datetime import datetime, timedelta
-from scripts.predict import predict
-from scripts.update_data import update_binance_ohlcv
+from scripts.features import FeatureEngine
+from scripts.market_data import MarketData
+from scripts.timeline import PredictionTimeline
+from scripts.plot_view import PlotView, repeat_button
 
-# ========== Actualización ==========
+# ========== Timeframes ==========
+# Sin descargas al abrir: los datos se actualizan con `python main.py gui patrones --update`
 TIMEFRAMES = ["1m", "5m", "15m"]
-for tf in TIMEFRAMES:
-    update_binance_ohlcv("PEPE/USDT", tf)
 
 # ========== Carga de datos ==========
-df_1m = pd.read_csv("data/historical_data/PEPEUSDT_1m.csv")
-df_5m = pd.read_csv("data/historical_data/PEPEUSDT_5m.csv")
-df_15m = pd.read_csv("data/historical_data/PEPEUSDT_15m.csv")
+market = MarketData.load("PEPE/USDT", TIMEFRAMES)
+df_1m, df_5m, df_15m = market["1m"], market["5m"], market["15m"]
 
-for df in [df_1m, df_5m, df_15m]:
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
+engines = {"5m": FeatureEngine.from_frame(df_5m), "15m": FeatureEngine.from_frame(df_15m)}
 
 step_index = 0
 window_minutes = 120
+prefetch_minutes = 1440  # Se precalcula un día hacia cada lado de la vista
 model_paths = {"5m": "models/ppo_predictor_5m", "15m": "models/ppo_predictor_15m"}
 
-def prepare_data(df):
-    df = df.copy()
-    df["close"] = df["close"].astype(float)
-    df["return"] = df["close"].pct_change().fillna(0)
-    df["volume"] = df["volume"].astype(float)
-    df["ema_9"] = df["close"].ewm(span=9).mean()
-    df["ema_21"] = df["close"].ewm(span=21).mean()
-    df["ema_trend_up"] = (df["ema_9"] > df["ema_21"]).astype(int)
-    return df[["return", "volume", "ema_9", "ema_21", "ema_trend_up"]]
+# Predicciones por minuto calculadas en segundo plano y cacheadas
+timeline = PredictionTimeline(engines, model_paths)
 
 def detect_pattern(preds):
-    return len(preds) >= 3 and preds[0] < preds[1] > preds[2]
+    """Pico en la vela del medio, para una matriz (n, 3) de predicciones (NaN = sin predicción)."""
+    return (preds[:, 0] < preds[:, 1]) & (preds[:, 1] > preds[:, 2])
 
 def update_plot():
     global step_index
     end_time = df_1m["timestamp"].iloc[-1] + timedelta(minutes=step_index)
     start_time = end_time - timedelta(minutes=window_minutes)
 
-    data = df_1m[(df_1m["timestamp"] >= start_time) & (df_1m["timestamp"] <= end_time)].copy()
-    data["timestamp_local"] = data["timestamp"] - timedelta(hours=3)
+    data = market.range("1m", start_time, end_time)
+    timestamps_local = data["timestamp"] - timedelta(hours=3)
 
-    fig.clear()
-    ax = fig.add_subplot(111)
-    ax.plot(data["timestamp_local"], data["close"], label="Precio 1m", color="black")
+    view.set_line("price", timestamps_local, data["close"])
 
-    for idx, row in data.iterrows():
-        timestamp = row["timestamp"]
-        x_time = row["timestamp_local"]
-        close_price = row["close"]
+    # Vela de cada tf que contiene a cada minuto (alineación precalculada) -> predicción ya calculada
+    marks = np.zeros(len(data), dtype=bool)
+    missing = []
+    for tf in ["5m", "15m"]:
+        alignment = market.alignment(tf)
+        n_rows = alignment[data.index.values] + 1
+        preds, _, tf_missing = timeline.lookup(tf, n_rows)
+        marks |= detect_pattern(preds)
+        missing += tf_missing
 
-        for tf, df_tf in zip(["5m", "15m"], [df_5m, df_15m]):
-            subset = df_tf[df_tf["timestamp"] <= timestamp].copy()
-            if len(subset) < 10:
-                continue
-            input_df = prepare_data(subset)
-            preds = predict(input_df, model_paths[tf], return_only=True)
-            if detect_pattern(preds[:3]):
-                ax.plot(x_time, close_price, marker="o", color="green", markersize=6)
-                break  # si ya marcó en una, no repite
+        # Prefetch de las regiones vecinas (navegación sin esperas)
+        if len(data):
+            lo = max(data.index[0] - prefetch_minutes, 0)
+            hi = min(data.index[-1] + prefetch_minutes, len(alignment) - 1)
+            timeline.prefetch(tf, alignment[lo] + 1, alignment[hi] + 1)
 
-    ax.set_title(f"Precio PEPEUSDT (1m) hasta {end_time.strftime('%Y-%m-%d %H:%M')}")
-    ax.grid()
-    canvas.draw()
+    view.set_line("marks", timestamps_local[marks], data["close"][marks])
+
+    title = f"Precio PEPEUSDT (1m) hasta {end_time.strftime('%Y-%m-%d %H:%M')}"
+    if missing:
+        title += " (calculando predicciones...)"
+        timeline.when_ready(root, missing, update_plot)
+    view.update(title)
 
 def move(minutes):
     global step_index
     step_index += minutes
     if step_index > 0:
         step_index = 0
-    update_plot()
+    # Clicks seguidos se juntan en un solo redibujo con el step_index final
+    view.request(root, update_plot)
 
 def go_back(): move(-1)
 def go_forward(): move(1)
@@ -95,6 +93,11 @@ fig = plt.Figure(figsize=(10, 5))
 canvas = FigureCanvasTkAgg(fig, master=root)
 canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
+# Artistas creados una sola vez: cada paso sólo actualiza sus datos
+view = PlotView(fig, canvas, legend=False)
+view.line("price", label="Precio 1m", color="black")
+view.line("marks", marker="o", color="green", markersize=6, linestyle="none")
+
 btn_frame = ttk.Frame(root)
 btn_frame.pack(side=tk.BOTTOM, pady=10)
 
@@ -110,7 +113,12 @@ controls = [
 ]
 
 for i, (label, cmd) in enumerate(controls):
-    ttk.Button(btn_frame, text=label, command=cmd).grid(row=0, column=i, padx=4)
+    # Los botones de 1 min repiten mientras se mantienen apretados
+    button = repeat_button(btn_frame, label, cmd) if i < 2 else ttk.Button(btn_frame, text=label, command=cmd)
+    button.grid(row=0, column=i, padx=4)
+
+root.bind("<Left>", lambda e: go_back())
+root.bind("<Right>", lambda e: go_forward())
 
 update_plot()
 root.mainloop()
@@ -1,50 +1,48 @@
 import tkinter as tk
 from tkinter import ttk
-import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from datetime import datetime, timedelta
 from scripts.predict import predict
-import os
-from scripts.update_data import update_binance_ohlcv
+from scripts.features import FeatureEngine
+from scripts.market_data import MarketData
+from scripts.plot_view import PlotView, repeat_button
 
-# ================== ACTUALIZACIÓN DE DATOS ==================
+# ================== TIMEFRAMES ==================
+# Sin descargas al abrir: los datos se actualizan con `python main.py gui predictor --update`
 TIMEFRAMES = ["1m", "3m", "5m", "15m", "1h"] #, "1d"
-for tf in TIMEFRAMES:
-    update_binance_ohlcv("PEPE/USDT", tf)
 
 
 # ====================== CARGA DE DATOS ======================
-df_1m = pd.read_csv("data/historical_data/PEPEUSDT_1m.csv")
-df_3m = pd.read_csv("data/historical_data/PEPEUSDT_3m.csv")
-df_5m = pd.read_csv("data/historical_data/PEPEUSDT_5m.csv")
-df_15m = pd.read_csv("data/historical_data/PEPEUSDT_15m.csv")
-df_1h = pd.read_csv("data/historical_data/PEPEUSDT_1h.csv")
-df_1d = pd.read_csv("data/historical_data/PEPEUSDT_1d.csv")
+market = MarketData.load("PEPE/USDT", TIMEFRAMES + ["1d"])
+df_1m, df_3m, df_5m, df_15m, df_1h, df_1d = (market[tf] for tf in ["1m", "3m", "5m", "15m", "1h", "1d"])
 
-for df in [df_1m, df_3m, df_5m, df_15m, df_1h]: #, df_1d
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
+# Features calculadas una sola vez por timeframe
+engines = {tf: FeatureEngine.from_frame(df) for tf, df in zip(TIMEFRAMES, [df_1m, df_3m, df_5m, df_15m, df_1h])}
 
 # ===================== VARIABLES GLOBALES ====================
 step_index = 0  # 0 es ahora, -1 es 1 min antes, +1 es 1 min después
 
 # ===================== FUNCION DE PREDICCION ==================
-def get_predictions(df, model_path):
-    df = df.copy()
-    df["close"] = df["close"].astype(float)
-    df["return"] = df["close"].pct_change().fillna(0)
-    df["volume"] = df["volume"].astype(float)
-    df["ema_9"] = df["close"].ewm(span=9).mean()
-    df["ema_21"] = df["close"].ewm(span=21).mean()
-    df["ema_trend_up"] = (df["ema_9"] > df["ema_21"]).astype(int)
-
-    df = df[["return", "volume", "ema_9", "ema_21", "ema_trend_up"]]
+def get_predictions(tf, end_time, model_path):
+    # Features as-of end_time desde las columnas precalculadas (sin recalcular el histórico)
+    df = engines[tf].features_asof(end_time, 20)
 
     pred_returns = predict(df, model_path, return_only=True)
     return pred_returns
 
 
 # ===================== ACTUALIZAR GRAFICO =====================
+PRED_STYLES = {
+    # tf: (minutos por paso, color, marker, linestyle)
+    "1m": (1, "blue", "o", "--"),
+    "3m": (3, "orange", "x", ":"),
+    "5m": (5, "red", "^", "-"),
+    "15m": (10, "purple", "s", "-"),
+    "1h": (20, "green", "d", "-"),
+    #"1d": (1440, "brown", "P", "-"),
+}
+
 def update_plot():
     global step_index
     window_minutes = 50
@@ -52,30 +50,17 @@ def update_plot():
     end_time = df_1m["timestamp"].iloc[-1] + timedelta(minutes=step_index)
     start_time = end_time - timedelta(minutes=window_minutes)
 
-    data = df_1m[(df_1m["timestamp"] >= start_time) & (df_1m["timestamp"] <= end_time)].copy()
-    data["timestamp_local"] = data["timestamp"] - timedelta(hours=3)
-
-
-    fig.clear()
-    ax = fig.add_subplot(111)
-    ax.plot(data["timestamp_local"], data["close"], label="Precio real", color="black")
+    data = market.range("1m", start_time, end_time)
+    view.set_line("price", data["timestamp"] - timedelta(hours=3), data["close"])
 
     if step_index <= 0:
         # Obtener último precio antes del punto actual
-        last_10 = df_1m[df_1m["timestamp"] <= end_time].iloc[-10:].copy()
+        last_10 = market.asof("1m", end_time, 10)
         last_close = last_10["close"].values[-1]
 
         # Cargar predicciones
-        preds = {
-            "1m": (get_predictions(df_1m[df_1m["timestamp"] <= end_time], "models/ppo_predictor_1m"), 1, "blue", "o", "--"),
-            "3m": (get_predictions(df_3m[df_3m["timestamp"] <= end_time], "models/ppo_predictor_3m"), 3, "orange", "x", ":"),
-            "5m": (get_predictions(df_5m[df_5m["timestamp"] <= end_time], "models/ppo_predictor_5m"), 5, "red", "^", "-"),
-            "15m": (get_predictions(df_15m[df_15m["timestamp"] <= end_time], "models/ppo_predictor_15m"), 10, "purple", "s", "-"),
-            "1h": (get_predictions(df_1h[df_1h["timestamp"] <= end_time], "models/ppo_predictor_1h"), 20, "green", "d", "-"),
-            #"1d": (get_predictions(df_1d[df_1d["timestamp"] <= end_time], "models/ppo_predictor_1d"), 1440, "brown", "P", "-"),
-        }
-        
-        for label, (preds_arr, interval, color, marker, linestyle) in preds.items():
+        for label, (interval, _, _, _) in PRED_STYLES.items():
+            preds_arr = get_predictions(label, end_time, f"models/ppo_predictor_{label}")
             future_times = []
             prices = []
             for i, r in enumerate(preds_arr):
@@ -84,18 +69,12 @@ def update_plot():
                     future_times.append(end_time + timedelta(minutes=i * interval + j + 1))
                     prices.append(last_close * (1 + r))
             future_times = [t - timedelta(hours=3) for t in future_times]
-            ax.plot(future_times, prices, label=f"Predicción {label}", marker=marker, linestyle=linestyle, color=color)
+            view.set_line(label, future_times, prices)
 
-        real_future = df_1m[(df_1m["timestamp"] > end_time) & (df_1m["timestamp"] <= end_time + timedelta(minutes=90))]
-        if not real_future.empty:
-            real_future["timestamp_local"] = real_future["timestamp"] - timedelta(hours=3)
-            ax.plot(real_future["timestamp_local"], real_future["close"], label="Real futuro", color="green", linewidth=2, alpha=0.6)
+        real_future = market.range("1m", end_time, end_time + timedelta(minutes=90), closed="right")
+        view.set_line("future", real_future["timestamp"] - timedelta(hours=3), real_future["close"])
 
-    ax.set_title(f"Precio PEPEUSDT hasta {end_time.strftime('%Y-%m-%d %H:%M')}")
-    ax.legend()
-    ax.grid()
-
-    canvas.draw()
+    view.update(f"Precio PEPEUSDT hasta {end_time.strftime('%Y-%m-%d %H:%M')}")
 
 
 # ===================== FUNCIONES DE NAVEGACION =====================
@@ -105,7 +84,8 @@ def move(minutes):
     max_future = 0 # no dejamos ir hacia futuro más allá del último timestamp
     if step_index > max_future:
         step_index = max_future
-    update_plot()
+    # Clicks seguidos se juntan en un solo redibujo con el step_index final
+    view.request(root, update_plot)
 
 def go_back(): move(-1)
 def go_forward(): move(1)
@@ -124,14 +104,21 @@ fig = plt.Figure(figsize=(10, 5))
 canvas = FigureCanvasTkAgg(fig, master=root)
 canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
+# Artistas creados una sola vez: cada paso sólo actualiza sus datos
+view = PlotView(fig, canvas)
+view.line("price", label="Precio real", color="black")
+for label, (_, color, marker, linestyle) in PRED_STYLES.items():
+    view.line(label, label=f"Predicción {label}", marker=marker, linestyle=linestyle, color=color)
+view.line("future", label="Real futuro", color="green", linewidth=2, alpha=0.6)
+
 btn_frame = ttk.Frame(root)
 btn_frame.pack(side=tk.BOTTOM, pady=10)
 
 # Botones 1 minuto
-btn_back = ttk.Button(btn_frame, text="<- Anterior", command=go_back)
+btn_back = repeat_button(btn_frame, "<- Anterior", go_back)  # Mantener apretado = avanzar de a 1 min
 btn_back.grid(row=0, column=0, padx=5)
 
-btn_forward = ttk.Button(btn_frame, text="Siguiente ->", command=go_forward)
+btn_forward = repeat_button(btn_frame, "Siguiente ->", go_forward)
 btn_forward.grid(row=0, column=1, padx=5)
 
 # Botones 30 minutos
@@ -155,5 +142,9 @@ btn_back_1d.grid(row=0, column=6, padx=5)
 btn_forward_1d = ttk.Button(btn_frame, text="1 d ->", command=forward_1d)
 btn_forward_1d.grid(row=0, column=7, padx=5)
 
+# Flechas del teclado (con autorepeat al mantenerlas)
+root.bind("<Left>", lambda e: go_back())
+root.bind("<Right>", lambda e: go_forward())
+
 update_plot()
 root.mainloop()
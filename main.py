@@ -1,123 +1,434 @@
+import argparse
 import os
-import pandas as pd
+import shutil
 import sys
 import logging
-from scripts.download_data import download_binance_ohlcv
-from scripts.agent import train_agent
-from scripts.predict import predict
-from scripts.backtest import backtest
-from scripts.update_data import update_binance_ohlcv
-from scripts.evaluate_agent import evaluate_agent
-from scripts.evaluate_agent_direction import evaluate_agent_direction
-
-# Preguntar si se deben mostrar gráficos
-show_graphs = input("¿Mostrar gráficos en pasos 6 y 7? (s/n): ").strip().lower() == 's'
-
-# Configurar logging
-os.makedirs("logs", exist_ok=True)
-os.makedirs("results", exist_ok=True)
-
-logging.basicConfig(
-    filename="logs/log.txt",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
-
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.INFO)
-formatter = logging.Formatter("%(message)s")
-console_handler.setFormatter(formatter)
-logging.getLogger().addHandler(console_handler)
+from scripts import spans
+from scripts.spans import span
 
+# Las librerías pesadas (torch/stable_baselines3, ccxt, matplotlib, tkinter) se
+# importan dentro de cada paso: `predict` sólo carga NumPy, pandas y la política
+# exportada a .npz, y arranca en menos de un segundo.
+
+SYMBOL = "PEPE/USDT"
 TIMEFRAMES = ["1m", "3m", "5m", "15m", "1h", "1d"]
+N_ENVS = 1  # Workers de entrenamiento por modelo (>1 usa un SubprocVecEnv)
+PARALLEL_TRAINING = True  # Entrenar los timeframes pendientes en un pool de procesos
+TRAIN_WORKERS = None  # None = min(timeframes pendientes, núcleos)
+DERIVE_FROM_1M = True  # Sólo se descarga 1m; 3m..1d se agregan localmente desde 1m
+SINCE_DAYS = 720  # Historia de una descarga completa
+SPANS = True  # Tiempos/CPU/RSS por paso y timeframe en logs/spans.jsonl (False = sin overhead)
+PROMETHEUS_SNAPSHOT = True  # Además, snapshot en formato Prometheus en logs/metrics.prom
+PATTERN_DAYS = 700  # Días de 1m sobre los que corre la detección de patrones
+COMMANDS = ["all", "download", "update", "train", "predict", "evaluate", "detect", "gui"]
+GUIS = {
+    "predictor": "gui_predictor",
+    "patrones": "gui_pattern_detector",
+    "clasificacion": "gui_classification_visualizer",
+    "momentos": "moments_navigation",
+}
 
-logging.info("=== INICIANDO PROCESO DE ENTRENAMIENTO Y PREDICCIÓN ===")
 
-dataframes = {}
-test_dataframes = {}
+def model_path_for(tf):
+    return f"models/ppo_predictor_{tf}"
 
-# Paso 1: Descargar datos si no existen y actualizar si existen
-for tf in TIMEFRAMES:
-    file_path = f"data/historical_data/PEPEUSDT_{tf}.csv"
-    if not os.path.exists(file_path):
-        logging.info(f"🔽 Descargando velas {tf}...")
-        download_binance_ohlcv("PEPE/USDT", tf)
-    else:
-        logging.info(f"🔄 Archivo existente para {tf}, actualizando...")
-        update_binance_ohlcv("PEPE/USDT", tf)
-
-# Paso 2: Calcular variaciones porcentuales y guardar los dataframes
-for tf in TIMEFRAMES:
-    file_path = f"data/historical_data/PEPEUSDT_{tf}.csv"
-    df = pd.read_csv(file_path)
-    df = df.drop(columns=["timestamp"], errors="ignore")
-    df["close"] = df["close"].astype(float)
-    df["return"] = df["close"].pct_change().fillna(0) 
-    df["volume"] = df["volume"].astype(float)
-    df["ema_9"] = df["close"].ewm(span=9).mean()
-    df["ema_21"] = df["close"].ewm(span=21).mean()
-    df["ema_trend_up"] = (df["ema_9"] > df["ema_21"]).astype(int) #para más polarización usar df["ema_trend_up"] = np.where(df["ema_9"] > df["ema_21"], 1, -1)
-    
-    # ------ FEATURES TO BE SENT TO THE AGENT -------
-    df = df[["return", "volume", "ema_9", "ema_21", "ema_trend_up"]]
-    
-    dataframes[tf] = df
-    logging.info(f"📈 Datos procesados para {tf}")
-
-# Paso 3: Entrenar modelos (solo si no existen)
-for tf in TIMEFRAMES:
-    model_path = f"models/ppo_predictor_{tf}"
-    if os.path.exists(f"{model_path}.zip"):
-        logging.info(f"🧠 Modelo ya existe para {tf}, salteando entrenamiento.")
-        # Si ya existe, usamos el 20% final como test
-        test_len = int(len(dataframes[tf]) * 0.2)
-        test_dataframes[tf] = dataframes[tf].iloc[-test_len:].copy()
+
+def has_model(tf, extensions=(".zip", ".npz")):
+    """True si hay modelo para `tf` con alguna de `extensions` (PPO .zip o política NumPy .npz); si no, avisa."""
+    model_path = model_path_for(tf)
+    if any(os.path.exists(f"{model_path}{ext}") for ext in extensions):
+        return True
+    logging.info(f"⚠️  No hay modelo para {tf}: correr `python main.py train -t {tf}`")
+    return False
+
+
+def setup_logging():
+    os.makedirs("logs", exist_ok=True)
+    os.makedirs("results", exist_ok=True)
+
+    logging.basicConfig(
+        filename="logs/log.txt",
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
+    formatter = logging.Formatter("%(message)s")
+    console_handler.setFormatter(formatter)
+    logging.getLogger().addHandler(console_handler)
+
+
+# ======================= PASOS =======================
+def update_data(timeframes=TIMEFRAMES, full_download=False, since_days=SINCE_DAYS):
+    """
+    Paso 1: descargar datos si no existen y actualizar si existen (todos los
+    timeframes a la vez sobre una sola sesión de exchange). Con full_download
+    se rehace la descarga completa de los últimos `since_days` días.
+    """
+    from scripts.async_download import download_ohlcv, sync_timeframes
+    from scripts.candle_store import CandleStore
+    from scripts.resample import update_resampled_timeframes
+
+    if DERIVE_FROM_1M:
+        fetched, derived = ["1m"], [tf for tf in timeframes if tf != "1m"]
     else:
-        logging.info(f"🧠 Entrenando modelo para {tf}...")
-        test_df = train_agent(dataframes[tf], model_path)
-        test_dataframes[tf] = test_df
-        logging.info(f"✅ Modelo entrenado para {tf}")
-
-# Paso 4: Predecir las próximas 3 velas
-for tf in TIMEFRAMES:
-    model_path = f"models/ppo_predictor_{tf}"
-    logging.info(f"\n🔮 Prediciendo próximas 3 velas (variación y precios) para {tf}:")
-    predict(dataframes[tf], model_path, steps=3)
-
-# Paso 5: Evaluar modelo con backtesting aleatorio de todo y de los úultimos 20%
-for tf in TIMEFRAMES:
-    model_path = f"models/ppo_predictor_{tf}"
-    
-    #logging.info(f"\n📊 Backtest completo para {tf} (TODO el dataset)...")
-    avg_all, _ = backtest(dataframes[tf], model_path, steps=3, n_tests=100, test_split_only=False)
-    logging.info(f"🔁 MSE promedio (todo el dataset) para {tf}: {avg_all:.6f}")
-
-    #logging.info(f"\n📊 Backtest parcial para {tf} (sólo 20% final)...")
-    avg_last, _ = backtest(dataframes[tf], model_path, steps=3, n_tests=100, test_split_only=True)
-    logging.info(f"🔁 MSE promedio (último 20%) para {tf}: {avg_last:.6f}\n")
-
-# Paso 6: Evaluación visual con gráfico + reward acumulado
-reward_matrix = []
-for tf in TIMEFRAMES:
-    model_path = f"models/ppo_predictor_{tf}"
-    reward_df = evaluate_agent(model_path, dataframes[tf], predict_steps=3, tf_name=tf, show_plot=show_graphs)
-    reward_matrix.append(reward_df)
-
-# Unir todo en un DataFrame y guardarlo
-final_rewards_df = pd.concat(reward_matrix)
-final_rewards_df.to_csv("results/rewards.csv")
-print("\n📊 Tabla de Rewards acumulados por timeframe y vela:")
-print(final_rewards_df)
-
-# Paso 7: Evaluar si el modelo acierta la dirección de las velas futuras
-direction_reward_df = pd.DataFrame()
-
-for tf in TIMEFRAMES:
-    model_path = f"models/ppo_predictor_{tf}"
-    logging.info(f"\n🎯 Evaluando dirección correcta para {tf}...")
-    direction_df = evaluate_agent_direction(model_path, dataframes[tf], predict_steps=3, tf_name=tf, show_plot=show_graphs)
-    direction_reward_df = pd.concat([direction_reward_df, direction_df])
-
-# Guardar resultados
-direction_reward_df.to_csv("results/direction_rewards.csv")
-logging.info("\n📁 Rewards por dirección guardados en results/direction_rewards.csv")
\ No newline at end of file
+        fetched, derived = list(timeframes), []
+
+    with span("1_descarga") as step:
+        if full_download:
+            added = {tf: download_ohlcv(SYMBOL, tf, since_days) for tf in fetched}
+            # Los derivados se vuelven a armar completos desde el 1m nuevo
+            for tf in derived:
+                shutil.rmtree(CandleStore(SYMBOL, tf).path, ignore_errors=True)
+        else:
+            added = sync_timeframes(SYMBOL, fetched, since_days)
+        added.update(update_resampled_timeframes(SYMBOL, derived))
+        step["rows"] = int(sum(added.values()))
+        logging.info(f"📥 Velas nuevas por timeframe: {added}")
+    return added
+
+
+def load_features(timeframes=TIMEFRAMES):
+    """Paso 2: calcular variaciones porcentuales y features de cada timeframe."""
+    from scripts.candle_store import load_candles
+    from scripts.features import prepare_data
+
+    dataframes = {}
+    with span("2_features"):
+        for tf in timeframes:
+            with span("features", timeframe=tf) as s:
+                df = load_candles(SYMBOL, tf)
+
+                # ------ FEATURES TO BE SENT TO THE AGENT -------
+                df = prepare_data(df)
+
+                dataframes[tf] = df
+                s["rows"] = len(df)
+            logging.info(f"📈 Datos procesados para {tf}")
+    return dataframes
+
+
+def train_models(dataframes, retrain=False, n_envs=N_ENVS, parallel=PARALLEL_TRAINING, workers=TRAIN_WORKERS):
+    """
+    Paso 3: entrenar los modelos que no existen (o todos con retrain) y exportar
+    la política determinística a NumPy (.npz) para las herramientas que sólo predicen.
+    Retorna {tf: tramo de test}.
+    """
+    from scripts.agent import train_agent
+    from scripts.features import split_point
+    from scripts.numpy_policy import export_numpy_policy, load_numpy_policy
+    from scripts.train_parallel import train_timeframes_parallel
+
+    test_dataframes = {}
+    with span("3_entrenamiento") as step:
+        pending = {}
+        for tf, data in dataframes.items():
+            model_path = model_path_for(tf)
+            if os.path.exists(f"{model_path}.zip") and not retrain:
+                logging.info(f"🧠 Modelo ya existe para {tf}, salteando entrenamiento.")
+                # Si ya existe, usamos el 20% final como test (rango de filas, sin copia)
+                test_dataframes[tf] = data.iloc[split_point(len(data)):]
+            else:
+                pending[tf] = (data, model_path)
+
+        step["rows"] = int(sum(len(data) for data, _ in pending.values()))
+        if parallel and len(pending) > 1:
+            # Timeframes independientes: se entrenan en paralelo, un proceso por timeframe
+            logging.info(f"🧠 Entrenando {len(pending)} modelos en paralelo: {', '.join(pending)}")
+            test_dataframes.update(train_timeframes_parallel(pending, max_workers=workers, n_envs=n_envs))
+            step["parallel"] = True
+        else:
+            for tf, (data, model_path) in pending.items():
+                logging.info(f"🧠 Entrenando modelo para {tf}...")
+                with span("entrenamiento", timeframe=tf) as s:
+                    test_df = train_agent(data, model_path, n_envs=n_envs)
+                    s["rows"] = len(data)
+                test_dataframes[tf] = test_df
+                logging.info(f"✅ Modelo entrenado para {tf}")
+
+    with span("exportar_politica"):
+        for tf in dataframes:
+            model_path = model_path_for(tf)
+            if load_numpy_policy(model_path) is None:
+                export_numpy_policy(model_path)
+                logging.info(f"📦 Política NumPy exportada para {tf}")
+    return test_dataframes
+
+
+def predict_next(dataframes):
+    """Paso 4: predecir las próximas 3 velas de cada timeframe."""
+    from scripts.predict import predict
+
+    with span("4_prediccion"):
+        for tf, data in dataframes.items():
+            if not has_model(tf):
+                continue
+            model_path = model_path_for(tf)
+            logging.info(f"\n🔮 Prediciendo próximas 3 velas (variación y precios) para {tf}:")
+            with span("prediccion", timeframe=tf):
+                predict(data, model_path, steps=3)
+
+
+def evaluate_models(dataframes, show_graphs=False):
+    """Pasos 5-8: backtest, evaluación de rewards, dirección y PnL."""
+    import pandas as pd
+    from scripts.backtest import walk_forward_backtest
+    from scripts.evaluate_agent import evaluate_agent
+    from scripts.evaluate_agent_direction import evaluate_agent_direction
+    from scripts.evaluation_engine import get_predictions
+    from scripts.features import split_point
+    from scripts.pnl_simulator import equity_curve, plot_equity, simulate_grid
+
+    # Timeframes sin modelo se saltean con el mismo aviso que en la predicción
+    # (la evaluación cachea por hash del .zip: la política NumPy sola no alcanza)
+    dataframes = {tf: data for tf, data in dataframes.items() if has_model(tf, (".zip",))}
+    if not dataframes:
+        return
+
+    # Predicciones de evaluación: una sola pasada por (modelo, datos), cacheada en disco.
+    # Si no hay datos nuevos ni modelo reentrenado, los pasos 5-7 no corren inferencia.
+    predictions = {}
+    with span("predicciones_evaluacion"):
+        for tf, data in dataframes.items():
+            with span("predicciones", timeframe=tf) as s:
+                predictions[tf] = get_predictions(model_path_for(tf), data, predict_steps=3)
+                s["rows"] = len(predictions[tf])
+
+    # Paso 5: Backtest determinístico (todas las posiciones válidas) de todo y de los últimos 20%
+    backtest_frames = []
+    with span("5_backtest"):
+        for tf, data in dataframes.items():
+            with span("backtest", timeframe=tf) as s:
+                s["rows"] = len(data)
+                model_path = model_path_for(tf)
+
+                for scope, test_split_only in (("todo el dataset", False), ("último 20%", True)):
+                    report = walk_forward_backtest(
+                        data, {tf: model_path}, steps=3, test_split_only=test_split_only,
+                        predictions={tf: predictions[tf]},
+                    )
+                    report.insert(1, "scope", scope)
+                    backtest_frames.append(report)
+
+                    overall = report[report["vela"] == "all"].iloc[0]
+                    logging.info(
+                        f"🔁 MSE promedio ({scope}) para {tf}: {overall['mse']:.6f} "
+                        f"[IC95 {overall['mse_low']:.6f} - {overall['mse_high']:.6f}] | "
+                        f"dirección {overall['dir_acc']:.2%} [{overall['dir_acc_low']:.2%} - {overall['dir_acc_high']:.2%}]"
+                    )
+                logging.info("")
+
+    pd.concat(backtest_frames).to_csv("results/backtest.csv", index=False)
+
+    # Paso 6: Evaluación visual con gráfico + reward acumulado
+    reward_matrix = []
+    with span("6_evaluacion"):
+        for tf, data in dataframes.items():
+            with span("evaluacion", timeframe=tf) as s:
+                s["rows"] = len(data)
+                reward_df = evaluate_agent(model_path_for(tf), data, predict_steps=3, tf_name=tf, show_plot=show_graphs, predictions=predictions[tf])
+                reward_matrix.append(reward_df)
+
+    # Unir todo en un DataFrame y guardarlo
+    final_rewards_df = pd.concat(reward_matrix)
+    final_rewards_df.to_csv("results/rewards.csv")
+    print("\n📊 Tabla de Rewards acumulados por timeframe y vela:")
+    print(final_rewards_df)
+
+    # Paso 7: Evaluar si el modelo acierta la dirección de las velas futuras
+    direction_reward_df = pd.DataFrame()
+
+    with span("7_direccion"):
+        for tf, data in dataframes.items():
+            with span("direccion", timeframe=tf) as s:
+                s["rows"] = len(data)
+                logging.info(f"\n🎯 Evaluando dirección correcta para {tf}...")
+                direction_df = evaluate_agent_direction(model_path_for(tf), data, predict_steps=3, tf_name=tf, show_plot=show_graphs, predictions=predictions[tf])
+                direction_reward_df = pd.concat([direction_reward_df, direction_df])
+
+    # Guardar resultados
+    direction_reward_df.to_csv("results/direction_rewards.csv")
+    logging.info("\n📁 Rewards por dirección guardados en results/direction_rewards.csv")
+
+    # Paso 8: Simular la estrategia derivada de las predicciones (grilla umbral x horizonte).
+    # Umbral y horizonte se eligen por Sharpe en el tramo de entrenamiento [0, split)
+    # y se reportan fuera de muestra, en el tramo de test [split, n).
+    pnl_frames = []
+    with span("8_pnl"):
+        for tf, data in dataframes.items():
+            with span("pnl", timeframe=tf) as s:
+                s["rows"] = len(data)
+                returns = data["return"].values
+                split = split_point(len(data))
+                for scope, start, end in (("entrenamiento", 0, split), ("test", split, None)):
+                    grid = simulate_grid(predictions[tf], returns, timeframe=tf, start=start, end=end)
+                    grid.insert(0, "timeframe", tf)
+                    grid.insert(1, "scope", scope)
+                    pnl_frames.append(grid)
+
+                train_grid, test_grid = pnl_frames[-2], pnl_frames[-1]
+                chosen = train_grid.loc[train_grid["sharpe"].idxmax()]
+                best = test_grid[(test_grid["horizon"] == chosen["horizon"]) &
+                                 (test_grid["threshold"] == chosen["threshold"])].iloc[0]
+                logging.info(
+                    f"💰 {tf}: umbral {best['threshold']:.4f}, horizonte {int(best['horizon'])} "
+                    f"(Sharpe {chosen['sharpe']:.2f} en entrenamiento) | test: Sharpe {best['sharpe']:.2f} | "
+                    f"retorno {best['total_return']:.2%} | drawdown {best['max_drawdown']:.2%} | "
+                    f"turnover {best['turnover']:.3f}"
+                )
+                equity, _ = equity_curve(predictions[tf], returns, timeframe=tf, start=split,
+                                         threshold=best["threshold"], horizon=int(best["horizon"]))
+                plot_equity(equity, tf_name=tf, label=f"test: umbral {best['threshold']:.4f} / horizonte {int(best['horizon'])}",
+                            show_plot=show_graphs)
+
+    pd.concat(pnl_frames).to_csv("results/pnl_grid.csv", index=False)
+    logging.info("📁 Grilla de PnL guardada en results/pnl_grid.csv")
+
+
+def detect_patterns(days=PATTERN_DAYS):
+    """Patrones de 30 min sobre los últimos `days` días de 1m -> results/patrones_detectados.csv."""
+    import pandas as pd
+    from scripts.candle_store import load_candles
+    from scripts.deteccion_cambios import detectar_patrones
+
+    df = load_candles(SYMBOL, "1m")
+    df = df[df["timestamp"] >= df["timestamp"].max() - pd.Timedelta(days=days)]
+    patrones = pd.DataFrame(detectar_patrones(df), columns=["timestamp", "patron"])
+    patrones.to_csv("results/patrones_detectados.csv", index=False)
+    logging.info(f"🔎 {len(patrones)} patrones detectados en {days} días -> results/patrones_detectados.csv")
+    return patrones
+
+
+def finish_spans(recorder):
+    # Resumen de tiempos por paso/timeframe (spans en logs/spans.jsonl)
+    if recorder is not None:
+        recorder.close()
+        logging.info(f"\n⏱️ Tiempos por paso (corrida {recorder.run_id}):\n{recorder.summary()}")
+        if PROMETHEUS_SNAPSHOT:
+            logging.info(f"📁 Métricas Prometheus en {recorder.write_prometheus()}")
+
+
+# ======================= SUBCOMANDOS =======================
+def cmd_pipeline(args):
+    logging.info("=== INICIANDO PROCESO DE ENTRENAMIENTO Y PREDICCIÓN ===")
+    recorder = spans.configure(enabled=SPANS)
+    if not args.no_update:
+        update_data(args.timeframes)
+    dataframes = load_features(args.timeframes)
+    train_models(dataframes, retrain=args.retrain, n_envs=args.n_envs,
+                 parallel=not args.sequential, workers=args.workers)
+    predict_next(dataframes)
+    evaluate_models(dataframes, show_graphs=args.graphs)
+    finish_spans(recorder)
+
+
+def cmd_download(args):
+    update_data(args.timeframes, full_download=True, since_days=args.since_days)
+
+
+def cmd_update(args):
+    update_data(args.timeframes)
+
+
+def cmd_train(args):
+    recorder = spans.configure(enabled=SPANS)
+    if args.update:
+        update_data(args.timeframes)
+    train_models(load_features(args.timeframes), retrain=args.retrain, n_envs=args.n_envs,
+                 parallel=not args.sequential, workers=args.workers)
+    finish_spans(recorder)
+
+
+def cmd_predict(args):
+    if args.update:
+        update_data(args.timeframes)
+    predict_next(load_features(args.timeframes))
+
+
+def cmd_evaluate(args):
+    recorder = spans.configure(enabled=SPANS)
+    if args.update:
+        update_data(args.timeframes)
+    evaluate_models(load_features(args.timeframes), show_graphs=args.graphs)
+    finish_spans(recorder)
+
+
+def cmd_detect(args):
+    if args.update:
+        update_data(["1m"])
+    detect_patterns(args.days)
+
+
+def cmd_gui(args):
+    import runpy
+
+    if args.update:
+        update_data(TIMEFRAMES)
+    # Las GUIs son scripts: se corren como __main__ (igual que `python gui_predictor.py`)
+    runpy.run_module(GUIS[args.name], run_name="__main__", alter_sys=True)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Predictor PPO de velas: descarga, entrenamiento, predicción y evaluación. "
+                    "Sin subcomando corre el proceso completo (`all`, pasos 1-8).")
+
+    timeframes = argparse.ArgumentParser(add_help=False)
+    timeframes.add_argument("-t", "--timeframes", nargs="+", choices=TIMEFRAMES, default=TIMEFRAMES,
+                            help="Timeframes a procesar (por defecto todos)")
+    update = argparse.ArgumentParser(add_help=False)
+    update.add_argument("--update", action="store_true", help="Actualizar los datos desde el exchange antes de empezar")
+    graphs = argparse.ArgumentParser(add_help=False)
+    graphs.add_argument("--graphs", action="store_true", help="Mostrar los gráficos de los pasos 6-8 (si no, sólo se guardan)")
+    training = argparse.ArgumentParser(add_help=False)
+    training.add_argument("--retrain", action="store_true", help="Reentrenar aunque el modelo ya exista")
+    training.add_argument("--n-envs", type=int, default=N_ENVS, help="Workers de entrenamiento por modelo")
+    training.add_argument("--workers", type=int, default=TRAIN_WORKERS, help="Procesos para entrenar timeframes en paralelo")
+    training.add_argument("--sequential", action="store_true", default=not PARALLEL_TRAINING,
+                          help="Entrenar los timeframes de a uno")
+
+    sub = parser.add_subparsers(dest="command", title="subcomandos")
+    p = sub.add_parser("all", parents=[timeframes, graphs, training], help="Proceso completo: pasos 1-8 (por defecto)")
+    p.add_argument("--no-update", action="store_true", help="No actualizar los datos (paso 1)")
+    p.set_defaults(func=cmd_pipeline)
+
+    p = sub.add_parser("download", parents=[timeframes], help="Descarga completa (rehace almacén y CSV)")
+    p.add_argument("--since-days", type=int, default=SINCE_DAYS, help="Días de historia a descargar")
+    p.set_defaults(func=cmd_download)
+
+    p = sub.add_parser("update", parents=[timeframes], help="Trae sólo las velas nuevas")
+    p.set_defaults(func=cmd_update)
+
+    p = sub.add_parser("train", parents=[timeframes, update, training], help="Entrena los modelos que faltan y exporta la política NumPy")
+    p.set_defaults(func=cmd_train)
+
+    p = sub.add_parser("predict", parents=[timeframes, update], help="Predice las próximas 3 velas (sin torch)")
+    p.set_defaults(func=cmd_predict)
+
+    p = sub.add_parser("evaluate", parents=[timeframes, update, graphs], help="Backtest, rewards, dirección y PnL (pasos 5-8)")
+    p.set_defaults(func=cmd_evaluate)
+
+    p = sub.add_parser("detect", parents=[update], help="Detecta patrones en 1m -> results/patrones_detectados.csv")
+    p.add_argument("--days", type=int, default=PATTERN_DAYS, help="Días de historia a analizar")
+    p.set_defaults(func=cmd_detect)
+
+    p = sub.add_parser("gui", parents=[update], help="Abre una de las GUIs de navegación")
+    p.add_argument("name", choices=list(GUIS), help="GUI a abrir")
+    p.set_defaults(func=cmd_gui)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Sin subcomando (p. ej. `python main.py --graphs`) corre el proceso completo
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ("-h", "--help")):
+        argv = ["all"] + argv
+    args = parser.parse_args(argv)
+    setup_logging()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
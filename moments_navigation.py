@@ -4,12 +4,12 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from datetime import datetime, timedelta
+from scripts.market_data import MarketData
+from scripts.plot_view import PlotView, repeat_button
 
 # === CARGA DE DATOS ===
-df = pd.read_csv("data/historical_data/PEPEUSDT_1m.csv")
-df["timestamp"] = pd.to_datetime(df["timestamp"])
-df = df.sort_values("timestamp")
-df["close"] = df["close"].astype(float)
+market = MarketData.load("PEPE/USDT", ["1m"])
+df = market["1m"]
 
 # === CARGA DE PATRONES DETECTADOS ===
 patrones = pd.read_csv("results/patrones_detectados.csv")
@@ -30,6 +30,12 @@ fig = plt.Figure(figsize=(10, 5))
 canvas = FigureCanvasTkAgg(fig, master=plot_frame)
 canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
+# Artistas creados una sola vez: cada paso sólo actualiza sus datos
+view = PlotView(fig, canvas)
+view.line("antes", color="black", label="Antes")
+view.line("despues", color="green", label="Después")
+view.vline("deteccion", color="red", linestyle="--", label="Detección")
+
 info_frame = ttk.Frame(main_frame, width=200)
 info_frame.pack(side=tk.RIGHT, fill=tk.Y)
 
@@ -56,41 +62,34 @@ def update_plot():
 
     inicio = ts - timedelta(minutes=50)
     fin = ts + timedelta(minutes=60)
-    segmento = df[(df["timestamp"] >= inicio) & (df["timestamp"] <= fin)].copy()
-
-    fig.clear()
-    ax = fig.add_subplot(111)
-    segmento["timestamp_local"] = segmento["timestamp"] - timedelta(hours=3)
-
-    antes = segmento[segmento["timestamp"] <= ts]
-    despues = segmento[segmento["timestamp"] > ts]
+    antes = market.range("1m", inicio, ts)
+    despues = market.range("1m", ts, fin, closed="right")
 
-    ax.plot(antes["timestamp_local"], antes["close"], color="black", label="Antes")
-    ax.plot(despues["timestamp_local"], despues["close"], color="green", label="Después")
-
-    ax.axvline(ts - timedelta(hours=3), color="red", linestyle="--", label="Detección")
-    ax.set_title(f"#{index+1} - PEPEUSDT 1m - Patrón: {clase}")
-    ax.grid()
-    ax.legend()
-    canvas.draw()
+    view.set_line("antes", antes["timestamp"] - timedelta(hours=3), antes["close"])
+    view.set_line("despues", despues["timestamp"] - timedelta(hours=3), despues["close"])
+    view.set_vline("deteccion", ts - timedelta(hours=3))
+    view.update(f"#{index+1} - PEPEUSDT 1m - Patrón: {clase}")
 
 # === FUNCIONES DE NAVEGACION ===
 def siguiente():
     global index
     index += 1
-    update_plot()
+    view.request(root, update_plot)  # Clicks seguidos -> un solo redibujo
 
 def anterior():
     global index
     index -= 1
-    update_plot()
+    view.request(root, update_plot)
 
 # === BOTONES ===
-btn_prev = ttk.Button(btn_frame, text="<- Anterior", command=anterior)
+btn_prev = repeat_button(btn_frame, "<- Anterior", anterior)
 btn_prev.grid(row=0, column=0, padx=10)
 
-btn_next = ttk.Button(btn_frame, text="Siguiente ->", command=siguiente)
+btn_next = repeat_button(btn_frame, "Siguiente ->", siguiente)
 btn_next.grid(row=0, column=1, padx=10)
 
+root.bind("<Left>", lambda e: anterior())
+root.bind("<Right>", lambda e: siguiente())
+
 update_plot()
 root.mainloop()
@@ -1,24 +1,76 @@
+import logging
+import multiprocessing as mp
+import os
 from stable_baselines3 import PPO
-from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
 from env.candle_env import CandlePredictionEnv
+from scripts.features import split_point
 
 
-def train_agent(data, model_path, predict_steps=3):
+TOTAL_TIMESTEPS = 100_000
+
+
+class LogProgressCallback(BaseCallback):
+    """Loguea el avance del entrenamiento cada `log_every` timesteps."""
+
+    def __init__(self, tf_name, total_timesteps, log_every=10_000):
+        super().__init__()
+        self.tf_name = tf_name
+        self.total_timesteps = total_timesteps
+        self.log_every = log_every
+        self._next_log = log_every
+
+    def _on_step(self):
+        if self.num_timesteps >= self._next_log:
+            logging.info(f"⏳ {self.tf_name}: {self.num_timesteps}/{self.total_timesteps} timesteps")
+            self._next_log += self.log_every
+        return True
+
+
+def save_model_atomic(model, model_path):
+    # Guardar en un temporal y renombrar: nunca queda un .zip a medio escribir
+    base_path = model_path[:-4] if model_path.endswith(".zip") else model_path
+    tmp_path = f"{base_path}.tmp.zip"
+    model.save(tmp_path)
+    os.replace(tmp_path, f"{base_path}.zip")
+
+
+def _make_env(train_df, predict_steps, random_start):
+    # Cada worker construye su propio entorno (nada de compartir una instancia)
+    def _init():
+        return Monitor(CandlePredictionEnv(train_df, predict_steps=predict_steps, random_start=random_start))
+    return _init
+
+
+def train_agent(data, model_path, predict_steps=3, n_envs=1, callback=None, total_timesteps=None):
     # Preprocessing: prepare 'return' and 'volume' columns to be sent agent
-    data = data.copy()
     required_cols = ["return", "volume"]
 
     for col in required_cols:
         if col not in data.columns:
             raise ValueError(f"❌ Falta la columna requerida: '{col}'")
-    
+
     # 80/20 - train/Test division (First 80% train - Last 20% backtest)
-    train_df = data.iloc[:int(len(data) * 0.8)].copy()
-    test_df = data.iloc[int(len(data) * 0.8):].copy()
+    # Rangos de filas sobre la matriz canónica: vistas, sin copias
+    split = split_point(len(data))
+    train_df = data.iloc[:split]
+    test_df = data.iloc[split:]
+
+    # Entorno y vectorización: con varios workers cada episodio arranca en una
+    # posición al azar del 80% de train (sorteada en cada reset, distinta por worker)
+    last_start = len(train_df) - predict_steps - 1
+    if last_start <= 10:
+        raise ValueError("⚠️ Muy pocos datos para entrenar.")
+    env_fns = [_make_env(train_df, predict_steps, random_start=n_envs > 1) for _ in range(n_envs)]
 
-    # Entorno y vectorización
-    env = CandlePredictionEnv(train_df, predict_steps=predict_steps)
-    vec_env = make_vec_env(lambda: env, n_envs=1)
+    if n_envs > 1:
+        # fork arranca los workers sin re-importar el script que llama a train_agent
+        start_method = "fork" if "fork" in mp.get_all_start_methods() else None
+        vec_env = SubprocVecEnv(env_fns, start_method=start_method)
+    else:
+        vec_env = DummyVecEnv(env_fns)
 
     # Configuración y entrenamiento del modelo
     model = PPO(
@@ -32,8 +84,9 @@ def train_agent(data, model_path, predict_steps=3):
         ent_coef=0.01
     )
 
-    model.learn(total_timesteps=100_000)
-    model.save(model_path)
+    model.learn(total_timesteps=total_timesteps or TOTAL_TIMESTEPS, callback=callback)
+    save_model_atomic(model, model_path)
+    vec_env.close()
 
     # Devolver datos de test
     return test_df
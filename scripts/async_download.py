@@ -0,0 +1,248 @@
+import asyncio
+import os
+import random
+import shutil
+import time
+import ccxt
+import pandas as pd
+from scripts.candle_store import COLUMNS, STORE_ROOT, CandleStore, csv_path, read_candles_csv, timeframe_ms
+
+TIMEFRAMES = ["1m", "3m", "5m", "15m", "1h", "1d"]
+PAGE_LIMIT = 1000
+REQUESTS_PER_SECOND = 10  # Muy por debajo del límite de peso de Binance para klines
+MAX_CONCURRENCY = 8
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 0.5
+FLUSH_ROWS = 200_000  # Velas acumuladas en orden antes de escribir un segmento
+
+# Errores transitorios: red, timeouts y rate limit (RateLimitExceeded hereda de NetworkError)
+RETRYABLE_ERRORS = (ccxt.NetworkError, ConnectionError, asyncio.TimeoutError)
+
+
+def split_ranges(start_ms, end_ms, timeframe, limit=PAGE_LIMIT):
+    """
+    Rangos [inicio, fin) de a lo sumo `limit` velas cubriendo [start_ms, end_ms).
+    Como en cada rango entra como máximo una vela por intervalo, la página pedida
+    desde su inicio siempre lo cubre completo (aunque haya huecos en los datos).
+    """
+    span = limit * timeframe_ms(timeframe)
+    starts = range(start_ms, max(end_ms, start_ms + 1), span)
+    return [(s, s + span) for s in starts]
+
+
+class TokenBucket:
+    """Rate limiter: `rate` pedidos por segundo con ráfagas de hasta `capacity`."""
+
+    def __init__(self, rate=REQUESTS_PER_SECOND, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class PageFetcher:
+    """
+    Pedidos de velas sobre una sesión de exchange compartida: token bucket
+    global, límite de pedidos en vuelo y reintentos con backoff exponencial.
+    """
+
+    def __init__(self, exchange, rate=REQUESTS_PER_SECOND, max_concurrency=MAX_CONCURRENCY,
+                 retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+        self.exchange = exchange
+        self.bucket = TokenBucket(rate)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.requests = 0
+        self.retried = 0
+
+    async def fetch(self, symbol, timeframe, since, limit=PAGE_LIMIT):
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire()
+            try:
+                async with self.semaphore:
+                    self.requests += 1
+                    return await self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.retries:
+                    raise
+                self.retried += 1
+                delay = self.backoff * 2 ** attempt * (1 + random.random())
+                print(f"⚠️  {symbol} {timeframe} since={since}: {type(e).__name__}, reintento en {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def fetch_range(self, symbol, timeframe, start_ms, end_ms, on_rows, limit=PAGE_LIMIT):
+        """
+        Descarga [start_ms, end_ms) con todas las páginas en paralelo y entrega
+        las velas a `on_rows` en orden temporal, a medida que se completa el prefijo.
+        """
+        ranges = split_ranges(start_ms, end_ms, timeframe, limit)
+
+        async def page(i, lo, hi):
+            rows = await self.fetch(symbol, timeframe, lo, limit)
+            # La última página queda abierta: incluye la vela en curso, como antes
+            if i < len(ranges) - 1:
+                rows = [r for r in rows if r[0] < hi]
+            return i, rows
+
+        done = {}
+        next_page = 0
+        for task in asyncio.as_completed([page(i, lo, hi) for i, (lo, hi) in enumerate(ranges)]):
+            i, rows = await task
+            done[i] = rows
+            while next_page in done:
+                on_rows(done.pop(next_page))
+                next_page += 1
+
+
+class _OrderedSink:
+    """Acumula velas que llegan en orden y las escribe al almacén en bloques grandes."""
+
+    def __init__(self, store, flush_rows=FLUSH_ROWS):
+        self.store = store
+        self.flush_rows = flush_rows
+        self.pending = []
+        self.added = 0
+
+    def __call__(self, rows):
+        self.pending.extend(rows)
+        if len(self.pending) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            df = pd.DataFrame(self.pending, columns=COLUMNS)
+            self.added += self.store.append(df)
+            self.pending = []
+        return self.added
+
+
+async def download_timeframe(fetcher, symbol="PEPE/USDT", timeframe="1m", since_days=720, root=STORE_ROOT):
+    """
+    Descarga completa de un timeframe. Se arma en un almacén temporal y recién
+    al terminar reemplaza al existente; después se regenera el CSV espejo.
+    """
+    end_ms = fetcher.exchange.milliseconds()
+    start_ms = end_ms - since_days * 86_400_000
+
+    tmp_store = CandleStore(symbol, timeframe, root=os.path.join(root, ".tmp"))
+    shutil.rmtree(tmp_store.path, ignore_errors=True)
+    sink = _OrderedSink(tmp_store)
+    await fetcher.fetch_range(symbol, timeframe, start_ms, end_ms, sink)
+    sink.flush()
+
+    store = CandleStore(symbol, timeframe, root=root)
+    shutil.rmtree(store.path, ignore_errors=True)
+    if tmp_store.exists():
+        os.makedirs(root, exist_ok=True)
+        os.replace(tmp_store.path, store.path)
+
+    file_path = csv_path(symbol, timeframe)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    store.read().to_csv(file_path, index=False)
+    print(f"[✓] {symbol} - {timeframe} descargado.")
+    return sink.added
+
+
+async def update_timeframe(fetcher, symbol="PEPE/USDT", timeframe="1m", root=STORE_ROOT):
+    """Trae las velas posteriores a la última guardada y las agrega al almacén y al CSV."""
+    file_path = csv_path(symbol, timeframe)
+    store = CandleStore(symbol, timeframe, root=root)
+
+    if not store.exists() and not os.path.exists(file_path):
+        print(f"⚠️  Archivo {file_path} no existe. No se puede actualizar.")
+        return 0
+
+    if not store.exists():
+        store.append(read_candles_csv(file_path))
+    last_ms = store.last_timestamp()
+
+    sink = _OrderedSink(store)
+    await fetcher.fetch_range(symbol, timeframe, last_ms + 1, fetcher.exchange.milliseconds(), sink)
+    added = sink.flush()
+
+    if not os.path.exists(file_path):
+        # Sin CSV espejo (se borró): se regenera completo desde el almacén, como en
+        # la descarga; un append dejaría un CSV con sólo las velas nuevas
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        store.read().to_csv(file_path, index=False)
+        print(f"📝 CSV de {timeframe} regenerado desde el almacén")
+
+    elif added:
+        # Sólo se escriben las velas nuevas: segmentos nuevos en el almacén + append al CSV
+        df_added = store.read(start=pd.to_datetime(last_ms + 1, unit="ms"))
+        df_added.to_csv(file_path, mode="a", header=False, index=False)
+
+    if added:
+        print(f"🆙 Datos de {timeframe} actualizados. Última vela: {pd.to_datetime(store.last_timestamp(), unit='ms')}")
+    else:
+        print(f"✅ {timeframe} ya está actualizado hasta {pd.to_datetime(last_ms, unit='ms')}")
+    return added
+
+
+def _make_exchange():
+    import ccxt.async_support as ccxt_async  # aiohttp sólo hace falta para descargar
+
+    # Límite de pedidos propio (token bucket): se desactiva el del cliente
+    return ccxt_async.binance({"enableRateLimit": False})
+
+
+async def sync_timeframes_async(symbol="PEPE/USDT", timeframes=TIMEFRAMES, since_days=720,
+                                exchange=None, root=STORE_ROOT, **fetcher_kwargs):
+    """
+    Descarga (si no hay datos) o actualiza cada timeframe, todos a la vez sobre
+    una única sesión de exchange. Retorna {tf: velas agregadas}.
+    """
+    own_exchange = exchange is None
+    exchange = exchange or _make_exchange()
+    fetcher = PageFetcher(exchange, **fetcher_kwargs)
+    try:
+        jobs = []
+        for tf in timeframes:
+            if not os.path.exists(csv_path(symbol, tf)) and not CandleStore(symbol, tf, root=root).exists():
+                print(f"🔽 Descargando velas {tf}...")
+                jobs.append(download_timeframe(fetcher, symbol, tf, since_days, root=root))
+            else:
+                print(f"🔄 Archivo existente para {tf}, actualizando...")
+                jobs.append(update_timeframe(fetcher, symbol, tf, root=root))
+        added = await asyncio.gather(*jobs)
+    finally:
+        if own_exchange:
+            await exchange.close()
+
+    print(f"📡 {fetcher.requests} pedidos ({fetcher.retried} reintentos)")
+    return dict(zip(timeframes, added))
+
+
+def sync_timeframes(symbol="PEPE/USDT", timeframes=TIMEFRAMES, since_days=720, **kwargs):
+    return asyncio.run(sync_timeframes_async(symbol, timeframes, since_days, **kwargs))
+
+
+async def _run_single(job, *args, exchange=None, **kwargs):
+    own_exchange = exchange is None
+    exchange = exchange or _make_exchange()
+    try:
+        return await job(PageFetcher(exchange), *args, **kwargs)
+    finally:
+        if own_exchange:
+            await exchange.close()
+
+
+def download_ohlcv(symbol="PEPE/USDT", timeframe="1m", since_days=720, **kwargs):
+    return asyncio.run(_run_single(download_timeframe, symbol, timeframe, since_days, **kwargs))
+
+
+def update_ohlcv(symbol="PEPE/USDT", timeframe="1m", **kwargs):
+    return asyncio.run(_run_single(update_timeframe, symbol, timeframe, **kwargs))
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from scripts.predict import Predictor
+
+# Orden ascendente de las 3 predicciones -> ID de patrón (igual que classify)
+PATTERN_IDS = {
+    (0, 1, 2): 1,
+    (0, 2, 1): 2,
+    (1, 0, 2): 3,
+    (1, 2, 0): 4,
+    (2, 0, 1): 5,
+    (2, 1, 0): 6,
+}
+_PATTERN_LOOKUP = np.zeros(27, dtype=np.int64)
+for _order, _pattern_id in PATTERN_IDS.items():
+    _PATTERN_LOOKUP[_order[0] * 9 + _order[1] * 3 + _order[2]] = _pattern_id
+
+
+def classify_batch(preds):
+    """
+    Versión vectorizada de classify para una matriz (n, 3) de predicciones:
+    argsort estable por fila (mismo desempate que sorted) -> ID de patrón.
+    """
+    order = np.argsort(np.asarray(preds)[:, :3], axis=1, kind="stable")
+    return _PATTERN_LOOKUP[order[:, 0] * 9 + order[:, 1] * 3 + order[:, 2]]
+
+
+def predict_asof(engine, predictor, timestamps, window_size=10):
+    """
+    Predicciones de un timeframe para muchos timestamps a la vez.
+    - As-of join: cada timestamp se mapea (búsqueda binaria) a la cantidad de
+      velas del timeframe con timestamp <= ts.
+    - Se arma la ventana que usaría predict() sobre ese histórico
+      (filas [n - 20, n - 10)) y se corre la política en lotes grandes.
+
+    Retorna (preds (n_ts, steps) float32, valid (n_ts,) bool).
+    """
+    ts = pd.to_datetime(pd.Series(timestamps)).values.astype("datetime64[ns]")
+    n_rows = np.searchsorted(engine.timestamps, ts, side="right")
+    valid = n_rows >= 2 * window_size
+
+    features = engine.feature_values()
+    starts = n_rows[valid] - 2 * window_size
+    windows = features[starts[:, None] + np.arange(window_size)]
+
+    preds = predictor.predict_many(windows) if len(windows) else np.empty((0, 3), dtype=np.float32)
+    out = np.full((len(ts), preds.shape[1]), np.nan, dtype=np.float32)
+    out[valid] = preds
+    return out, valid
+
+
+def backfill_classifications(patrones_df, market, engines, model_paths, timeframes, steps=3):
+    """
+    Clasifica todos los patrones detectados en todos los timeframes en lote.
+    Mismas columnas que el cálculo fila a fila: timestamp, patron, close,
+    pattern_{tf} y {tf}_step{j}.
+    """
+    timestamps = patrones_df["timestamp"]
+    output = pd.DataFrame({"timestamp": timestamps.values, "patron": patrones_df["patron"].values})
+
+    # Precio de cierre en 1m (sólo si hay una vela exactamente en ese minuto)
+    ts_1m = market["1m"]["timestamp"].values
+    ts = pd.to_datetime(timestamps).values.astype("datetime64[ns]")
+    idx = np.searchsorted(ts_1m, ts, side="left")
+    found = idx < len(ts_1m)
+    found[found] = ts_1m[idx[found]] == ts[found]
+    close = np.full(len(ts), np.nan)
+    close[found] = market["1m"]["close"].values[idx[found]]
+    output["close"] = close
+
+    for tf in timeframes:
+        print(f"🔮 {tf}: prediciendo {len(patrones_df)} registros en lote...")
+        preds, valid = predict_asof(engines[tf], Predictor(model_paths[tf]), timestamps)
+
+        patterns = np.zeros(len(preds), dtype=np.int64)
+        patterns[valid] = classify_batch(preds[valid])
+        output[f"pattern_{tf}"] = patterns
+
+        for j in range(steps):
+            # Siempre float64 (como el cálculo fila a fila), NaN donde no hay predicción
+            output[f"{tf}_step{j+1}"] = preds[:, j].astype(np.float64)
+
+    return output
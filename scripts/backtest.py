@@ -1,59 +1,126 @@
+import os
+from statistics import NormalDist
 import numpy as np
-from stable_baselines3 import PPO
-from env.candle_env import CandlePredictionEnv
-from stable_baselines3.common.env_util import make_vec_env
-import random
+import pandas as pd
+from scripts.evaluation_engine import get_predictions, predictions_at
+from scripts.features import split_point
 
-def backtest(data, model_path, steps=3, n_tests=100, test_split_only=True):
+CI_BATCHES = 30  # Lotes contiguos para los intervalos de confianza (batch means)
+
+
+def backtest_positions(n_rows, steps=3, n_tests=None, seed=0, n_strata=10):
     """
-    Evalúa el modelo sobre puntos aleatorios:
+    Posiciones a evaluar dentro de un dataset de n_rows filas: todas las válidas
+    (n_tests=None) o un subconjunto estratificado y reproducible: se reparten
+    n_tests entre n_strata bloques contiguos y se sortean con `seed`.
+    """
+    max_start = n_rows - steps - 10
+    if max_start < 1:
+        raise ValueError("⚠️ Muy pocos datos para testear.")
+    positions = np.arange(10, max_start)
+    if n_tests is None or n_tests >= len(positions):
+        return positions
+
+    rng = np.random.default_rng(seed)
+    strata = np.array_split(positions, min(n_strata, n_tests))
+    quotas = np.diff(np.linspace(0, n_tests, len(strata) + 1).round().astype(int))
+    chosen = [rng.choice(s, size=min(q, len(s)), replace=False) for s, q in zip(strata, quotas)]
+    return np.sort(np.concatenate(chosen))
+
+
+def _split(data, test_split_only):
+    # Rango de filas, no copia: returns es una vista de la columna de la matriz canónica
+    if "return" not in data.columns or "volume" not in data.columns:
+        raise ValueError("❌ El dataset debe contener columnas 'return' y 'volume'")
+    offset = split_point(len(data)) if test_split_only else 0
+    return data, offset, data["return"].to_numpy()[offset:]
+
+
+def backtest(data, model_path, steps=3, n_tests=None, test_split_only=True, predictions=None, seed=0):
+    """
+    Evalúa el modelo sobre todas las posiciones válidas (o un subconjunto
+    estratificado con semilla si se pasa n_tests), así el resultado no cambia
+    entre corridas:
     - Si test_split_only=True: sólo dentro del 20% final del dataset
     - Si test_split_only=False: sobre todo el dataset
 
+    Las predicciones salen del motor de evaluación (una pasada cacheada por
+    modelo+datos); se pueden pasar ya calculadas con `predictions`.
+
     Retorna el MSE promedio y la lista completa de errores.
     """
-    # Preprocesamiento: asegurar columnas necesarias
-    data = data.copy().reset_index(drop=True) 
-    #data["return"] = data["close"].pct_change().fillna(0)
-    #data["volume"] = data["volume"].fillna(0)
-    
-    # Validar columnas necesarias
-    if "return" not in data.columns or "volume" not in data.columns:
-        raise ValueError("❌ El dataset debe contener columnas 'return' y 'volume'")
-    
-    if test_split_only:
-        test_start = int(len(data) * 0.8)
-        data = data.iloc[test_start:].reset_index(drop=True)
+    data, offset, returns = _split(data, test_split_only)
+    if predictions is None:
+        predictions = get_predictions(model_path, data, predict_steps=steps)
 
-    model = PPO.load(model_path)
-    #total_error = 0
-    total_mse = []
+    positions = backtest_positions(len(returns), steps, n_tests, seed)
+    actions = predictions_at(predictions, positions, offset=offset)
+    true_returns = returns[positions[:, None] + np.arange(steps)]
 
-    # Elegir posiciones aleatorias válidas
-    max_start = len(data) - steps - 10
-    if max_start < 1:
-        raise ValueError("⚠️ Muy pocos datos para testear.")
-    positions = random.sample(range(10, max_start), min(n_tests, max_start - 10)) #positions = random.sample(range(10, max_start), n_tests)
+    total_mse = np.mean((actions - true_returns) ** 2, axis=1)
+    if not len(total_mse):
+        raise ValueError("❌ No se pudo evaluar ningún punto válido.")
 
-    for pos in positions:
-        env = CandlePredictionEnv(data, predict_steps=steps) #data, predict_steps=steps)
-        env.position = pos
-        obs = env._get_obs()
-        
-        # Se adapta a la cantidad de features
-        if obs.shape != env.observation_space.shape:
-            continue
+    return np.mean(total_mse), total_mse.tolist()
 
 
-        action, _ = model.predict(obs, deterministic=True)
-        true_returns = data.iloc[pos:pos + steps]["return"].values
+def _batch_means_ci(values, confidence=0.95, n_batches=CI_BATCHES):
+    """
+    Media e intervalo de confianza por medias de lotes contiguos: las
+    posiciones consecutivas comparten velas y están correlacionadas, así que
+    el error estándar se estima sobre lotes y no sobre cada punto.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    mean = values.mean()
+    batches = np.array_split(values, min(n_batches, len(values)))
+    if len(batches) < 2:
+        return mean, np.nan, np.nan
+    batch_means = np.array([b.mean() for b in batches])
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    half = z * batch_means.std(ddof=1) / np.sqrt(len(batches))
+    return mean, mean - half, mean + half
 
-        mse = np.mean((action - true_returns) ** 2)
-        #total_error += mse
-        total_mse.append(mse)
 
-    if not total_mse:
-        raise ValueError("❌ No se pudo evaluar ningún punto válido.")
+def walk_forward_backtest(data, model_paths, steps=3, test_split_only=True, n_tests=None,
+                          seed=0, predictions=None, confidence=0.95):
+    """
+    Backtest determinístico de uno o varios modelos sobre las MISMAS posiciones,
+    en una pasada vectorizada por modelo.
+
+    - model_paths: {nombre: ruta} (o lista de rutas; el nombre es el archivo).
+    - predictions: {nombre: predicciones del motor de evaluación} opcional.
+
+    Retorna un DataFrame con una fila por (modelo, vela) más una fila "all" por
+    modelo: n, MSE y precisión de dirección (signo predicho == signo real),
+    cada uno con su intervalo de confianza.
+    """
+    if not isinstance(model_paths, dict):
+        model_paths = {os.path.basename(p): p for p in model_paths}
+    predictions = predictions or {}
+
+    data, offset, returns = _split(data, test_split_only)
+    positions = backtest_positions(len(returns), steps, n_tests, seed)
+    true_returns = returns[positions[:, None] + np.arange(steps)]
+
+    rows = []
+    for name, model_path in model_paths.items():
+        preds = predictions.get(name)
+        if preds is None:
+            preds = get_predictions(model_path, data, predict_steps=steps)
+        actions = predictions_at(preds, positions, offset=offset)
+
+        squared = (actions - true_returns) ** 2
+        hits = (np.sign(actions) == np.sign(true_returns)).astype(np.float64)
+        horizons = [(str(i + 1), squared[:, i], hits[:, i]) for i in range(steps)]
+        horizons.append(("all", squared.mean(axis=1), hits.mean(axis=1)))
+
+        for horizon, sq, hit in horizons:
+            mse, mse_low, mse_high = _batch_means_ci(sq, confidence)
+            acc, acc_low, acc_high = _batch_means_ci(hit, confidence)
+            rows.append({
+                "model": name, "vela": horizon, "n": len(positions),
+                "mse": mse, "mse_low": mse_low, "mse_high": mse_high,
+                "dir_acc": acc, "dir_acc_low": acc_low, "dir_acc_high": acc_high,
+            })
 
-    avg_mse = np.mean(total_mse) #avg_error = total_error / n_tests
-    return avg_mse, total_mse
+    return pd.DataFrame(rows)
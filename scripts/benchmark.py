@@ -0,0 +1,348 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import matplotlib
+matplotlib.use("Agg")  # evaluate_agent grafica: sin ventanas durante el benchmark
+
+import numpy as np
+import pandas as pd
+
+SIZES = (10_000, 100_000, 1_000_000)
+REPEAT = 3
+BENCH_PATH = "results/benchmark.json"
+REGRESSION_THRESHOLD = 0.20  # +20% sobre el baseline = regresión
+ENV_STEPS = 10_000  # Pasos de step()/_get_obs() medidos por tamaño
+PREDICT_CALLS = 200
+FIXTURE_CANDLES = 2_000
+FIXTURE_TIMESTEPS = 256
+SCALING_TIMESTEPS = 20_000  # Timesteps por corrida de train_agent al medir escalado con n_envs
+SCALING_CANDLES = 200_000
+
+
+# ======================= DATOS SINTÉTICOS =======================
+def synthetic_ohlcv(n, seed=0, timeframe="1m", start="2023-01-01"):
+    """
+    Velas OHLCV sintéticas (caminata aleatoria geométrica con volatilidad
+    variable y volumen log-normal), con las mismas columnas y tipos que el
+    almacén: timestamp datetime64, precios y volumen float64.
+    """
+    rng = np.random.default_rng(seed)
+    vol = 0.002 * np.exp(np.cumsum(rng.normal(0, 0.01, n)).clip(-2, 2))
+    log_close = np.log(1e-5) + np.cumsum(rng.normal(0, 1, n) * vol)
+    close = np.exp(log_close)
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 1, n)) * vol * close
+    return pd.DataFrame({
+        "timestamp": pd.date_range(start, periods=n, freq=timeframe.replace("m", "min")),
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.lognormal(20, 1, n),
+    })
+
+
+def train_fixture(model_path, seed=0, n_candles=FIXTURE_CANDLES, timesteps=FIXTURE_TIMESTEPS):
+    """
+    PPO mínimo (misma política MlpPolicy que train_agent, pocos timesteps)
+    entrenado sobre datos sintéticos, con su política NumPy exportada.
+    Sólo sirve para medir tiempos: no predice nada útil.
+    """
+    from stable_baselines3 import PPO
+    from stable_baselines3.common.vec_env import DummyVecEnv
+    from env.candle_env import CandlePredictionEnv
+    from scripts.agent import save_model_atomic
+    from scripts.features import prepare_data
+    from scripts.numpy_policy import export_numpy_policy
+
+    data = prepare_data(synthetic_ohlcv(n_candles, seed=seed))
+    vec_env = DummyVecEnv([lambda: CandlePredictionEnv(data, predict_steps=3)])
+    model = PPO("MlpPolicy", vec_env, verbose=0, n_steps=128, batch_size=64, seed=seed, device="cpu")
+    model.learn(total_timesteps=timesteps)
+    save_model_atomic(model, model_path)
+    vec_env.close()
+    export_numpy_policy(model_path)
+    return model_path
+
+
+def train_scaling(n_envs_list, timesteps=SCALING_TIMESTEPS, n_candles=SCALING_CANDLES, log=print):
+    """
+    Throughput de train_agent (samples/s) para cada n_envs, sobre los mismos
+    datos sintéticos y timesteps: cuánto escala el entrenamiento con los
+    núcleos. Una corrida por n_envs (cada una tarda segundos o minutos).
+    """
+    from scripts.agent import train_agent
+    from scripts.features import prepare_data
+
+    data = prepare_data(synthetic_ohlcv(n_candles))
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench_train_") as tmp:
+        for n_envs in n_envs_list:
+            log(f"   ⏱️  train_agent n_envs={n_envs} ({timesteps:,} timesteps)...")
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                train_agent(data, os.path.join(tmp, f"ppo_{n_envs}"), n_envs=n_envs, total_timesteps=timesteps)
+            elapsed = time.perf_counter() - t0
+            results[f"train@n_envs={n_envs}"] = {
+                "min_ms": elapsed * 1000, "median_ms": None, "repeat": 1,
+                "items": timesteps, "per_item_us": elapsed * 1e6 / timesteps,
+            }
+    return results
+
+
+def format_scaling(results):
+    """Tabla n_envs / segundos / samples/s / speedup contra la primera corrida."""
+    rows = [(name.split("=")[1], r) for name, r in results.items() if name.startswith("train@n_envs=")]
+    if not rows:
+        return ""
+    base = rows[0][1]["min_ms"]
+    lines = [f"{'n_envs':>8}{'s':>10}{'samples/s':>12}{'speedup':>10}"]
+    for n_envs, r in rows:
+        lines.append(f"{n_envs:>8}{r['min_ms'] / 1000:>10.1f}{r['items'] / r['min_ms'] * 1000:>12.0f}{base / r['min_ms']:>10.2f}")
+    return "\n".join(lines)
+
+
+# ========================= MEDICIÓN =========================
+def measure(fn, repeat=REPEAT, setup=None, items=1):
+    """
+    Corre `fn` `repeat` veces (con `setup` antes de cada una, fuera del
+    tiempo medido). Retorna min/mediana en ms y, si items > 1, el tiempo por
+    ítem en µs (sobre el mínimo).
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    result = {"min_ms": min(times), "median_ms": float(np.median(times)), "repeat": repeat}
+    if items > 1:
+        result["items"] = items
+        result["per_item_us"] = min(times) * 1000 / items
+    return result
+
+
+@contextlib.contextmanager
+def _in_directory(path):
+    # Las funciones medidas escriben en rutas relativas (results/, data/)
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+def _bench_size(n, model_path, repeat, log):
+    from env.candle_env import CandlePredictionEnv
+    from scripts.backtest import backtest
+    from scripts.candle_store import STORE_ROOT, csv_path, load_candles, read_candles_csv
+    from scripts.deteccion_cambios import detectar_patrones
+    from scripts.evaluate_agent import evaluate_agent
+    from scripts.evaluate_agent_direction import evaluate_agent_direction
+    from scripts.evaluation_engine import _memory_cache, get_predictions
+    from scripts.features import prepare_data
+
+    results = {}
+    candles = synthetic_ohlcv(n)
+
+    def run(name, fn, **kwargs):
+        log(f"   ⏱️  {name}@{n}...")
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[f"{name}@{n}"] = measure(fn, repeat=repeat, **kwargs)
+
+    # ---------- Carga de velas: lectura del CSV (parseo y caché), import al almacén y lectura del almacén ----------
+    os.makedirs(os.path.dirname(csv_path()), exist_ok=True)
+    candles.to_csv(csv_path(), index=False)
+    store_path = os.path.join(STORE_ROOT, "PEPEUSDT_1m")
+    run("csv_parse", lambda: read_candles_csv(csv_path(), cache=False))
+    read_candles_csv(csv_path())  # Escribe la caché binaria al lado del CSV
+    run("csv_cached", lambda: read_candles_csv(csv_path()))
+    # load_candles con el almacén vacío: lee el CSV e importa todo al almacén columnar
+    run("store_import", lambda: load_candles("PEPE/USDT", "1m"),
+        setup=lambda: shutil.rmtree(store_path, ignore_errors=True))
+    run("store_read", lambda: load_candles("PEPE/USDT", "1m"))
+
+    # ---------- Features y detección de patrones ----------
+    run("prepare_data", lambda: prepare_data(candles))
+    data = prepare_data(candles)
+    run("detectar_patrones", lambda: detectar_patrones(candles))
+
+    # ---------- Entorno ----------
+    run("env_init", lambda: CandlePredictionEnv(data, predict_steps=3))
+    env = CandlePredictionEnv(data, predict_steps=3)
+    n_steps = min(ENV_STEPS, len(data) - env.start_position - env.predict_steps - 1)
+    action = np.zeros(3, dtype=np.float32)
+
+    def env_steps():
+        env.reset()
+        for _ in range(n_steps):
+            env.step(action)
+
+    run("env_reset_step", env_steps, items=n_steps)
+    positions = np.random.default_rng(0).integers(env.window_size, len(data), n_steps)
+
+    def env_obs():
+        for position in positions:
+            env.position = position
+            env._get_obs()
+
+    run("env_get_obs", env_obs, items=n_steps)
+
+    # ---------- Inferencia de evaluación (sin cache) y evaluaciones ----------
+    cache_dir = os.path.abspath("prediction_cache")
+
+    def clear_cache():
+        _memory_cache.clear()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    run("get_predictions", lambda: get_predictions(model_path, data, cache_dir=cache_dir), setup=clear_cache)
+    predictions = get_predictions(model_path, data, cache_dir=cache_dir)
+
+    run("backtest", lambda: backtest(data, model_path, test_split_only=False, predictions=predictions))
+    run("evaluate_agent", lambda: evaluate_agent(model_path, data, tf_name="bench", predictions=predictions))
+    run("evaluate_agent_direction",
+        lambda: evaluate_agent_direction(model_path, data, tf_name="bench", predictions=predictions))
+    return results
+
+
+def run_benchmarks(sizes=SIZES, repeat=REPEAT, workdir=None, log=print):
+    """
+    Corre todos los benchmarks en un directorio de trabajo descartable.
+    Retorna {"meta": {...}, "results": {"nombre@tamaño": {"min_ms", ...}}}.
+    """
+    from scripts.features import prepare_data
+    from scripts.predict import _model_cache, predict
+
+    own_workdir = workdir is None
+    workdir = os.path.abspath(workdir or tempfile.mkdtemp(prefix="bench_"))
+    os.makedirs(workdir, exist_ok=True)
+    results = {}
+    try:
+        with _in_directory(workdir):
+            log("🧠 Entrenando PPO de prueba...")
+            model_path = os.path.abspath("models/ppo_bench")
+            os.makedirs("models", exist_ok=True)
+            train_fixture(model_path)
+
+            # Latencia de predict(): independiente del tamaño del histórico
+            data = prepare_data(synthetic_ohlcv(100))
+            _model_cache.clear()
+            t0 = time.perf_counter()
+            predict(data, model_path, return_only=True)
+            results["predict_first_call"] = {"min_ms": (time.perf_counter() - t0) * 1000, "median_ms": None, "repeat": 1}
+
+            def predict_calls():
+                for _ in range(PREDICT_CALLS):
+                    predict(data, model_path, return_only=True)
+
+            results["predict"] = measure(predict_calls, repeat=repeat, items=PREDICT_CALLS)
+
+            for n in sizes:
+                log(f"📏 {n:,} velas")
+                results.update(_bench_size(n, model_path, repeat, log))
+    finally:
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    meta = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "sizes": list(sizes),
+        "repeat": repeat,
+    }
+    return {"meta": meta, "results": results}
+
+
+# ========================= COMPARACIÓN =========================
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compara dos corridas por tiempo mínimo. Retorna un DataFrame con una fila
+    por benchmark presente en ambas: base_ms, actual_ms, ratio y estado
+    ("regresión" si ratio > 1 + threshold, "mejora" si < 1 - threshold).
+    Las mediciones de una sola muestra (predict_first_call) son informativas
+    y no se comparan.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or not base["min_ms"] or result["repeat"] < 2:
+            continue
+        ratio = result["min_ms"] / base["min_ms"]
+        status = "regresión" if ratio > 1 + threshold else "mejora" if ratio < 1 - threshold else "="
+        rows.append({"benchmark": name, "base_ms": base["min_ms"], "actual_ms": result["min_ms"],
+                     "ratio": ratio, "estado": status})
+    return pd.DataFrame(rows, columns=["benchmark", "base_ms", "actual_ms", "ratio", "estado"])
+
+
+def format_results(report):
+    lines = [f"{'benchmark':<34}{'min ms':>12}{'mediana ms':>12}{'µs/ítem':>12}"]
+    for name, r in report["results"].items():
+        median = f"{r['median_ms']:>12.2f}" if r.get("median_ms") is not None else f"{'-':>12}"
+        per_item = f"{r['per_item_us']:>12.2f}" if "per_item_us" in r else f"{'-':>12}"
+        lines.append(f"{name:<34}{r['min_ms']:>12.2f}{median}{per_item}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline de los caminos críticos (datos sintéticos)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="Cantidades de velas a medir")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="Repeticiones por benchmark (se reporta el mínimo)")
+    parser.add_argument("--out", default=BENCH_PATH, help="JSON de resultados")
+    parser.add_argument("--compare", help="JSON de una corrida anterior contra el que comparar")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Aumento relativo tolerado antes de marcar regresión (0.2 = +20%%)")
+    parser.add_argument("--workdir", help="Directorio de trabajo (por defecto uno temporal que se borra)")
+    parser.add_argument("--train-scaling", type=int, nargs="+", metavar="N_ENVS",
+                        help="Además, medir samples/s de train_agent con estos n_envs (p. ej. 1 2 4 8)")
+    parser.add_argument("--train-timesteps", type=int, default=SCALING_TIMESTEPS, help="Timesteps por corrida de --train-scaling")
+    args = parser.parse_args()
+
+    out_path = os.path.abspath(args.out)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    report = run_benchmarks(args.sizes, args.repeat, args.workdir)
+    if args.train_scaling:
+        print(f"🧠 Escalado de entrenamiento ({os.cpu_count()} CPUs)")
+        report["results"].update(train_scaling(args.train_scaling, args.train_timesteps))
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n📊 Resultados:")
+    print(format_results(report))
+    if args.train_scaling:
+        print("\n🧠 Escalado de train_agent:")
+        print(format_scaling(report["results"]))
+    print(f"\n📁 Guardado en {out_path}")
+
+    if baseline is not None:
+        table = compare(report, baseline, args.threshold)
+        print(f"\n🔍 Comparación contra {args.compare} (umbral {args.threshold:.0%}):")
+        print(table.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+        regressions = table[table["estado"] == "regresión"]
+        if len(regressions):
+            print(f"\n❌ {len(regressions)} regresión(es): {', '.join(regressions['benchmark'])}")
+            sys.exit(1)
+        print("\n✅ Sin regresiones")
+
+
+if __name__ == "__main__":
+    main()
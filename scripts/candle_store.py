@@ -0,0 +1,420 @@
+import glob
+import io
+import os
+import numpy as np
+import pandas as pd
+
+STORE_ROOT = "data/candle_store"
+CSV_ROOT = "data/historical_data"
+COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+PRICE_COLUMNS = COLUMNS[1:]
+MAX_SEGMENTS_PER_MONTH = 32
+_UNIT_MS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+
+class CandleStore:
+    """
+    Almacén columnar append-only de velas OHLCV para un símbolo y timeframe.
+
+    Layout en disco:
+        data/candle_store/PEPEUSDT_1m/2024-05/00000.timestamp.npy
+                                             00000.open.npy ...
+    - timestamp: int64 en ms (UTC); open/high/low/close/volume: float64.
+    - Una carpeta por mes; cada append escribe un segmento nuevo por mes tocado.
+    - Las lecturas abren los .npy con mmap y sólo copian el rango pedido.
+    """
+
+    def __init__(self, symbol="PEPE/USDT", timeframe="1m", root=STORE_ROOT):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.path = os.path.join(root, f"{symbol.replace('/', '')}_{timeframe}")
+
+    # ---------- estructura ----------
+    def exists(self):
+        return bool(self._months())
+
+    def _months(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(d for d in os.listdir(self.path) if os.path.isdir(os.path.join(self.path, d)))
+
+    def _segments(self, month):
+        # El archivo de timestamp se escribe último: sólo cuenta si está completo
+        files = sorted(glob.glob(os.path.join(self.path, month, "*.timestamp.npy")))
+        return [f[:-len(".timestamp.npy")] for f in files]
+
+    @staticmethod
+    def _load(segment, column):
+        return np.load(f"{segment}.{column}.npy", mmap_mode="r")
+
+    def _live_segments(self, month):
+        """
+        Segmentos vigentes del mes con su columna timestamp. Dentro de un mes
+        cada segmento empieza después de que termina el anterior; si uno se
+        solapa con los siguientes es porque una compactación se cortó entre
+        escribir el segmento unido y borrar los viejos: se ignora.
+        """
+        live = []
+        first = None
+        for segment in reversed(self._segments(month)):
+            ts = self._load(segment, "timestamp")
+            if first is not None and len(ts) and ts[-1] >= first:
+                continue
+            live.append((segment, ts))
+            if len(ts):
+                first = ts[0]
+        return live[::-1]
+
+    # ---------- escritura ----------
+    def _write_segment(self, month, columns):
+        month_dir = os.path.join(self.path, month)
+        os.makedirs(month_dir, exist_ok=True)
+        existing = self._segments(month)
+        next_id = int(os.path.basename(existing[-1])) + 1 if existing else 0
+        self._save_columns(os.path.join(month_dir, f"{next_id:05d}"), columns)
+
+    @staticmethod
+    def _save_columns(segment, columns):
+        # Escritura atómica por columna; timestamp al final como marca de segmento completo
+        for column in PRICE_COLUMNS + ["timestamp"]:
+            tmp_path = f"{segment}.{column}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, columns[column])
+            os.replace(tmp_path, f"{segment}.{column}.npy")
+
+    @staticmethod
+    def _remove_segment(segment):
+        for column in COLUMNS:
+            os.remove(f"{segment}.{column}.npy")
+
+    def append(self, df):
+        """
+        Agrega velas nuevas (timestamp > última guardada). `df` tiene las
+        columnas de COLUMNS; timestamp en datetime o en ms. Retorna cuántas
+        velas se agregaron.
+        """
+        if df is None or df.empty:
+            return 0
+
+        ts = _to_ms(df["timestamp"])
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+        # Sin duplicados dentro del lote (se queda la primera, como drop_duplicates)
+        keep = np.concatenate(([True], ts[1:] != ts[:-1]))
+        last = self.last_timestamp()
+        if last is not None:
+            keep &= ts > last
+        if not keep.any():
+            return 0
+
+        rows = order[keep]
+        columns = {"timestamp": ts[keep]}
+        for column in PRICE_COLUMNS:
+            columns[column] = df[column].to_numpy(dtype=np.float64)[rows]
+
+        months = columns["timestamp"].astype("datetime64[ms]").astype("datetime64[M]").astype(str)
+        for month in np.unique(months):
+            mask = months == month
+            self._write_segment(month, {c: v[mask] for c, v in columns.items()})
+            if len(self._segments(month)) > MAX_SEGMENTS_PER_MONTH:
+                self.compact(month)
+
+        return int(keep.sum())
+
+    def compact(self, month=None):
+        """
+        Une los segmentos de un mes (o de todos) en uno solo. El segmento unido
+        se escribe antes de borrar los viejos; si se corta en el medio, las
+        lecturas ignoran los viejos (_live_segments) y la próxima compactación
+        los borra.
+        """
+        for m in ([month] if month else self._months()):
+            segments = self._segments(m)
+            if len(segments) <= 1:
+                continue
+            live = [segment for segment, _ in self._live_segments(m)]
+            columns = {c: np.concatenate([self._load(s, c) for s in live]) for c in COLUMNS}
+            self._write_segment(m, columns)
+            for segment in segments:
+                self._remove_segment(segment)
+
+    def truncate(self, after_ms):
+        """
+        Borra las velas con timestamp > after_ms. Pensado para reemplazar la
+        última vela (parcial) de un timeframe derivado: sólo toca la cola.
+        El segmento que queda cortado se reemplaza por uno nuevo, como en compact.
+        """
+        cut_month = str(np.datetime64(int(after_ms), "ms").astype("datetime64[M]"))
+        for month in reversed(self._months()):
+            if month < cut_month:
+                return
+            for segment in reversed(self._segments(month)):
+                ts = self._load(segment, "timestamp")
+                keep = int(np.searchsorted(ts, after_ms, side="right"))
+                if keep == len(ts):
+                    return
+                if keep == 0:
+                    self._remove_segment(segment)
+                    continue
+                # El prefijo va a un segmento nuevo y después se borra el viejo (nunca se
+                # reescriben columnas en el lugar): si se corta en el medio, el viejo se
+                # solapa con el nuevo y _live_segments lo ignora
+                self._write_segment(month, {c: np.array(self._load(segment, c)[:keep]) for c in COLUMNS})
+                self._remove_segment(segment)
+                return
+            if not os.listdir(os.path.join(self.path, month)):
+                os.rmdir(os.path.join(self.path, month))
+
+    # ---------- lectura ----------
+    def last_timestamp(self):
+        """Último timestamp guardado (ms) o None; sólo toca el último segmento."""
+        for month in reversed(self._months()):
+            segments = self._segments(month)
+            if segments:
+                return int(self._load(segments[-1], "timestamp")[-1])
+        return None
+
+    def read(self, start=None, end=None):
+        """
+        DataFrame con las velas en [start, end] (ambos opcionales), con
+        timestamp en datetime64 y columnas float64, igual que el CSV parseado.
+        """
+        start_ms = _to_ms(pd.Series([start]))[0] if start is not None else None
+        end_ms = _to_ms(pd.Series([end]))[0] if end is not None else None
+        start_month = str(np.datetime64(int(start_ms), "ms").astype("datetime64[M]")) if start is not None else None
+        end_month = str(np.datetime64(int(end_ms), "ms").astype("datetime64[M]")) if end is not None else None
+
+        parts = {c: [] for c in COLUMNS}
+        for month in self._months():
+            if (start_month and month < start_month) or (end_month and month > end_month):
+                continue
+            for segment, ts in self._live_segments(month):
+                lo = np.searchsorted(ts, start_ms, side="left") if start is not None else 0
+                hi = np.searchsorted(ts, end_ms, side="right") if end is not None else len(ts)
+                if hi <= lo:
+                    continue
+                parts["timestamp"].append(ts[lo:hi])
+                for column in PRICE_COLUMNS:
+                    parts[column].append(self._load(segment, column)[lo:hi])
+
+        data = {
+            c: np.concatenate(v) if v else np.empty(0, dtype=np.int64 if c == "timestamp" else np.float64)
+            for c, v in parts.items()
+        }
+        df = pd.DataFrame(data)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+        return df
+
+
+def _to_ms(timestamps):
+    """Serie de timestamps (datetime, string o ms) -> ndarray int64 en ms."""
+    if pd.api.types.is_integer_dtype(timestamps):
+        return timestamps.to_numpy(dtype=np.int64)
+    return pd.to_datetime(timestamps).to_numpy(dtype="datetime64[ms]").astype(np.int64)
+
+
+def timeframe_ms(timeframe):
+    """'15m' -> 900000"""
+    return int(timeframe[:-1]) * _UNIT_MS[timeframe[-1]]
+
+
+def csv_path(symbol="PEPE/USDT", timeframe="1m"):
+    return f"{CSV_ROOT}/{symbol.replace('/', '')}_{timeframe}.csv"
+
+
+# ---------- lectura rápida de los CSV de velas ----------
+CSV_DTYPES = {column: np.float64 for column in PRICE_COLUMNS}
+# Timestamp como lo escribe DataFrame.to_csv: 'YYYY-MM-DD HH:MM:SS' (19 bytes + ',')
+_TS_SEPARATORS = {4: ord("-"), 7: ord("-"), 10: ord(" "), 13: ord(":"), 16: ord(":"), 19: ord(",")}
+_TS_FIELDS = {"year": (0, 4), "month": (5, 2), "day": (8, 2), "hour": (11, 2), "minute": (14, 2), "second": (17, 2)}
+_BISECT_BYTES = 1 << 16  # La búsqueda por offsets se detiene en bloques de 64 KB
+
+
+def parse_csv_timestamps(raw, starts):
+    """
+    Timestamps de formato fijo 'YYYY-MM-DD HH:MM:SS' al comienzo de cada
+    línea -> ndarray int64 en ms. `raw` son los bytes del CSV (uint8) y
+    `starts` el offset de cada línea. Los dígitos se leen directo de los
+    bytes, sin strings ni datetimes de Python. Retorna None si alguna línea
+    no tiene ese formato (el llamador usa pd.to_datetime).
+    """
+    if not len(starts):
+        return np.empty(0, dtype=np.int64)
+    if starts[-1] + 20 > len(raw):
+        return None
+    # Un solo gather de 20 bytes por línea (filas contiguas) en vez de uno por dígito
+    head = np.lib.stride_tricks.sliding_window_view(raw, 20)[starts]
+    for offset, char in _TS_SEPARATORS.items():
+        if not (head[:, offset] == char).all():
+            return None
+
+    digits = head - np.uint8(ord("0"))  # uint8: lo que no es dígito queda > 9
+    fields = {}
+    for name, (offset, width) in _TS_FIELDS.items():
+        block = digits[:, offset:offset + width]
+        if (block > 9).any():
+            return None
+        value = block[:, 0].astype(np.int32)
+        for k in range(1, width):
+            value *= 10
+            value += block[:, k]
+        fields[name] = value.astype(np.int64)
+
+    if ((fields["month"] < 1) | (fields["month"] > 12) | (fields["day"] < 1) | (fields["day"] > 31)
+            | (fields["hour"] > 23) | (fields["minute"] > 59) | (fields["second"] > 59)).any():
+        return None
+
+    months = (fields["year"] - 1970) * 12 + fields["month"] - 1
+    days = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) + fields["day"] - 1
+    seconds = ((days * 24 + fields["hour"]) * 60 + fields["minute"]) * 60 + fields["second"]
+    return seconds * 1000
+
+
+def _line_timestamp(f, offset, data_start):
+    """(offset, ms) de la primera línea completa que empieza en o después de `offset`; ms None al final."""
+    f.seek(offset)
+    if offset > data_start:
+        f.readline()  # Resto de la línea cortada
+    position = f.tell()
+    line = f.readline()
+    if not line.strip():
+        return position, None
+    ts = parse_csv_timestamps(np.frombuffer(line, dtype=np.uint8), np.zeros(1, dtype=np.int64))
+    if ts is None:
+        ts = _to_ms(pd.Series([line.split(b",", 1)[0].decode()]))
+    return position, int(ts[0])
+
+
+def _byte_range(f, data_start, size, start_ms, end_ms, block_bytes=_BISECT_BYTES):
+    """
+    Offsets [lo, hi) de un CSV ordenado por timestamp que contienen todas las
+    velas en [start_ms, end_ms] (con hasta `block_bytes` de más en cada borde,
+    que se filtran después). Búsqueda binaria sobre offsets: no se lee el resto
+    del archivo.
+    """
+    lo, hi = data_start, size
+    if start_ms is not None:
+        left, right = data_start, size
+        while right - left > block_bytes:
+            mid = (left + right) // 2
+            position, ts = _line_timestamp(f, mid, data_start)
+            if ts is None or ts >= start_ms:
+                right = mid
+            else:
+                left = position  # Esa línea y todas las anteriores son < start
+        lo = left
+    if end_ms is not None:
+        left, right = lo, size
+        while right - left > block_bytes:
+            mid = (left + right) // 2
+            _, ts = _line_timestamp(f, mid, data_start)
+            if ts is None or ts > end_ms:
+                right = mid  # Toda línea que empieza después de mid es > end
+            else:
+                left = mid
+        # Se incluye completa la línea que empieza en (o contiene a) `right`:
+        # _line_timestamp no la miró, miró la siguiente
+        f.seek(right)
+        f.readline()
+        hi = min(f.tell(), size)
+    return lo, hi
+
+
+def _parse_csv_bytes(header, body):
+    """Bytes de filas del CSV (sin encabezado) -> dict de columnas (timestamp en ms)."""
+    names = header.decode().strip().split(",")
+    prices = [c for c in names if c in CSV_DTYPES]
+    raw = np.frombuffer(body, dtype=np.uint8)
+    newlines = np.flatnonzero(raw == ord("\n"))
+    if len(body) and body[-1:] != b"\n":
+        newlines = np.append(newlines, len(raw))
+    starts = np.concatenate(([0], newlines[:-1] + 1)) if len(newlines) else np.empty(0, dtype=np.int64)
+    ts = parse_csv_timestamps(raw, starts) if names[0] == "timestamp" else None
+
+    # El timestamp ya parseado no pasa por el tokenizer/conversión de pandas
+    usecols = prices if ts is not None else prices + ["timestamp"]
+    df = pd.read_csv(io.BytesIO(body), names=names, header=None, usecols=usecols,
+                     dtype={c: CSV_DTYPES[c] for c in prices}, engine="c")
+    columns = {"timestamp": ts if ts is not None else _to_ms(df["timestamp"])}
+    for column in PRICE_COLUMNS:
+        columns[column] = df[column].to_numpy(dtype=np.float64) if column in df else np.full(len(df), np.nan)
+    return columns
+
+
+def _csv_cache_path(path):
+    return f"{path}.cache.npz"
+
+
+def _csv_source(path):
+    stat = os.stat(path)
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+def _read_csv_cache(path, source):
+    try:
+        with np.load(_csv_cache_path(path)) as cache:
+            if not np.array_equal(cache["source"], source):
+                return None
+            return {c: cache[c] for c in COLUMNS}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _write_csv_cache(path, source, columns):
+    cache_path = _csv_cache_path(path)
+    tmp_path = f"{cache_path}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, source=source, **columns)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # Sin permiso de escritura: se lee el CSV cada vez
+
+
+def read_candles_csv(path, start=None, end=None, usecols=None, cache=True, block_bytes=_BISECT_BYTES):
+    """
+    Lee un CSV de velas (timestamp, open, high, low, close, volume) y retorna
+    el mismo DataFrame que CandleStore.read(): timestamp en datetime64 y el
+    resto float64, sólo con las columnas de `usecols` (por defecto todas).
+
+    - Tipos explícitos y timestamps de formato fijo parseados desde los bytes.
+    - start/end (opcionales, inclusivos): sólo se leen los bytes del rango
+      (el CSV está ordenado por timestamp, como lo escriben las descargas);
+      la búsqueda de los bordes se detiene en bloques de `block_bytes`.
+    - Caché binaria al lado del CSV (<csv>.cache.npz), válida mientras el
+      tamaño y el mtime del CSV no cambien. Se escribe al leer el CSV completo.
+    """
+    usecols = [c for c in COLUMNS if c in (usecols or COLUMNS)]
+    start_ms = _to_ms(pd.Series([start]))[0] if start is not None else None
+    end_ms = _to_ms(pd.Series([end]))[0] if end is not None else None
+    source = _csv_source(path)
+
+    columns = _read_csv_cache(path, source) if cache else None
+    if columns is None:
+        with open(path, "rb") as f:
+            header = f.readline()
+            data_start = f.tell()
+            lo, hi = _byte_range(f, data_start, int(source[0]), start_ms, end_ms, block_bytes)
+            f.seek(lo)
+            columns = _parse_csv_bytes(header, f.read(hi - lo))
+        if cache and lo == data_start and hi == source[0]:
+            _write_csv_cache(path, source, columns)
+
+    ts = columns["timestamp"]
+    lo = np.searchsorted(ts, start_ms, side="left") if start is not None else 0
+    hi = np.searchsorted(ts, end_ms, side="right") if end is not None else len(ts)
+    data = {c: columns[c][lo:hi] for c in usecols}
+    if "timestamp" in data:
+        data["timestamp"] = data["timestamp"].astype("datetime64[ms]").astype("datetime64[ns]")
+    return pd.DataFrame(data)
+
+
+def load_candles(symbol="PEPE/USDT", timeframe="1m", start=None, end=None):
+    """
+    Velas de un timeframe desde el almacén columnar. Si todavía no existe,
+    se importa una vez desde el CSV de data/historical_data.
+    """
+    store = CandleStore(symbol, timeframe)
+    if not store.exists():
+        store.append(read_candles_csv(csv_path(symbol, timeframe)))
+    return store.read(start, end)
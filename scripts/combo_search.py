@@ -0,0 +1,140 @@
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+def _timeframe(col):
+    return col.split("_")[0]
+
+
+def _mask_ids(df, columns):
+    """
+    Id de máscara de NaN por columna. Columnas con el mismo patrón de NaN
+    comparten id; columnas sin NaN no filtran filas (id None).
+    """
+    masks, seen, ids = [], {}, {}
+    for col in columns:
+        valid = df[col].notna().to_numpy()
+        if valid.all():
+            ids[col] = None
+            continue
+        key = np.packbits(valid).tobytes()
+        if key not in seen:
+            seen[key] = len(masks)
+            masks.append(valid)
+        ids[col] = seen[key]
+    return ids, masks
+
+
+def _class_stats(codes, n_classes, values, mask):
+    """Sumas y conteos por clase de cada columna de `values` sobre las filas de `mask`."""
+    codes = codes[mask]
+    onehot = np.zeros((len(codes), n_classes))
+    onehot[np.arange(len(codes)), codes] = 1.0
+    return onehot.T @ values[mask], onehot.sum(axis=0)
+
+
+def _variance_components(sums, counts):
+    """
+    Varianza (ddof=1) entre clases de los promedios por clase, por columna:
+    lo mismo que groupby("patron").mean().var(). Con menos de 2 clases es 0
+    (pandas da NaN y .sum() lo ignora).
+    """
+    present = counts > 0
+    if present.sum() < 2:
+        return np.zeros(sums.shape[1])
+    means = sums[present] / counts[present, None]
+    return means.var(axis=0, ddof=1)
+
+
+def search_combinations(df, r_patterns=3, r_steps=3, top_k=10, max_workers=None):
+    """
+    Búsqueda de las combinaciones (patrones de modelo, steps de un timeframe)
+    con mayor varianza entre clases de 'patron', como en analisis_cambios.py.
+
+    El score sólo depende de las columnas de steps y de qué filas sobreviven
+    al dropna, así que:
+    - las combinaciones de patrones se agrupan por su firma de máscaras de NaN
+      (las que filtran las mismas filas son equivalentes);
+    - por cada máscara efectiva distinta se calculan una sola vez las sumas y
+      conteos por clase de cada step (en paralelo entre máscaras);
+    - el score de cada candidato es la suma de componentes ya calculados.
+
+    Retorna un DataFrame con los top_k candidatos ordenados por score
+    (empates: primero en el orden de iteración original).
+    """
+    pattern_cols = [col for col in df.columns if col.startswith("pattern_")]
+    step_cols = [col for col in df.columns if "_step" in col]
+
+    classes, codes = np.unique(df["patron"].dropna().to_numpy(), return_inverse=True)
+    class_codes = np.full(len(df), -1, dtype=np.int64)
+    class_codes[df["patron"].notna().to_numpy()] = codes
+
+    ids, masks = _mask_ids(df, ["patron"] + pattern_cols + step_cols)
+    values = df[step_cols].to_numpy(dtype=np.float64)
+    step_index = {col: i for i, col in enumerate(step_cols)}
+
+    # Combinaciones de patrones agrupadas por firma de máscaras (primera + cantidad)
+    signatures = {}
+    for pat_cols in itertools.combinations(pattern_cols, r=r_patterns):
+        signature = frozenset(ids[c] for c in pat_cols) - {None}
+        first, count = signatures.get(signature, (pat_cols, 0))
+        signatures[signature] = (first, count + 1)
+
+    # Grupos de steps del mismo timeframe
+    step_groups = []
+    for tf in dict.fromkeys(_timeframe(c) for c in step_cols):
+        if f"pattern_{tf}" not in df.columns:
+            continue
+        tf_steps = [c for c in step_cols if _timeframe(c) == tf]
+        step_groups.extend((tf, group) for group in itertools.combinations(tf_steps, r=r_steps))
+
+    # Candidatos -> máscara efectiva (conjunto de ids de máscara)
+    # Candidatos únicos por (máscara efectiva, steps); las firmas se insertan en
+    # orden de primera aparición, así que el representante es el primero del orden original
+    candidates = {}
+    needed = {}
+    for signature, (pat_cols, count) in signatures.items():
+        for tf, steps in step_groups:
+            key = frozenset((signature | {ids["patron"], ids[f"pattern_{tf}"]} | {ids[s] for s in steps}) - {None})
+            first, prev_count = candidates.get((key, steps), (pat_cols, 0))
+            candidates[(key, steps)] = (first, prev_count + count)
+            needed.setdefault(key, set()).update(step_index[s] for s in steps)
+
+    def evaluate(item):
+        key, cols = item
+        mask = class_codes >= 0
+        for mask_id in key:
+            mask = mask & masks[mask_id]
+        cols = sorted(cols)
+        sums, counts = _class_stats(class_codes, len(classes), values[:, cols], mask)
+        return key, int(mask.sum()), dict(zip(cols, _variance_components(sums, counts)))
+
+    # Las multiplicaciones de NumPy liberan el GIL: hilos, sin copiar los datos
+    max_workers = max_workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=min(max_workers, max(len(needed), 1))) as executor:
+        stats = {key: (n_rows, components) for key, n_rows, components in executor.map(evaluate, needed.items())}
+
+    rows = []
+    for (key, steps), (pat_cols, count) in candidates.items():
+        tf = _timeframe(steps[0])
+        n_rows, components = stats[key]
+        if n_rows == 0:
+            continue
+        rows.append({
+            "score": float(sum(components[step_index[s]] for s in steps)),
+            "timeframe": tf,
+            "patrones": list(pat_cols),
+            "steps": list(steps),
+            "equivalentes": count,
+            "filas": n_rows,
+        })
+
+    if not rows:
+        return pd.DataFrame(columns=["score", "timeframe", "patrones", "steps", "equivalentes", "filas"])
+
+    ranking = pd.DataFrame(rows)
+    ranking = ranking.sort_values("score", ascending=False, kind="stable")
+    return ranking.head(top_k).reset_index(drop=True)
@@ -1,73 +1,74 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
 import os
-
-# === CARGA DE DATOS ===
-df = pd.read_csv("data/historical_data/PEPEUSDT_1m.csv")
-df["timestamp"] = pd.to_datetime(df["timestamp"])
-df = df.sort_values("timestamp")
-df["close"] = df["close"].astype(float)
-
-# Filtramos últimos 60 días
-df = df[df["timestamp"] >= df["timestamp"].max() - timedelta(days=700)]
+from scripts.candle_store import read_candles_csv
 
 # === FUNCIONES DE DETECCIÓN ===
-def detectar_patrones(df):
-    patrones = []
-
-    for i in range(30, len(df)-30):
-        ventana = df.iloc[i-30:i+30].copy()
-        precios = ventana["close"].values
-
-        p0 = precios[29]
-        p1 = precios[35]
-        p2 = precios[59]
-
-        # Cambio acumulado
-        sube = (p1 - p0) / p0
-        baja = (p2 - p1) / p1
-        neto = (p2 - p0) / p0
-
-        ts = df.iloc[i]["timestamp"]
+# Reglas en orden de prioridad (equivalente al if/elif): (nombre, condición sobre sube/baja/neto)
+REGLAS = [
+    # Suba sostenida (> 5% en 30 min, sin baja importante)
+    ("Suba sostenida", lambda sube, baja, neto: (neto > 0.05) & (baja > -0.02)),
+    # Suba falsa (> 5% seguido por baja > 4%)
+    ("Suba falsa", lambda sube, baja, neto: (sube > 0.05) & (baja < -0.04)),
+    # Desplome sostenido (< -5% sin rebote)
+    ("Desplome sostenido", lambda sube, baja, neto: (neto < -0.05) & (baja < -0.02)),
+    # Desplome falso (< -5% y rebote rápido)
+    ("Desplome falso", lambda sube, baja, neto: (sube < -0.05) & (baja > 0.04)),
+    # Toque en el fondo y rebote fuerte
+    ("Fondo con rebote", lambda sube, baja, neto: (sube < -0.03) & (baja > 0.06)),
+    # Pico y caída fuerte
+    ("Pico y caída", lambda sube, baja, neto: (sube > 0.04) & (baja < -0.06)),
+]
 
-        # Suba sostenida (> 5% en 30 min, sin baja importante)
-        if neto > 0.05 and baja > -0.02:
-            patrones.append((ts, "Suba sostenida"))
-
-        # Suba falsa (> 5% seguido por baja > 4%)
-        elif sube > 0.05 and baja < -0.04:
-            patrones.append((ts, "Suba falsa"))
-
-        # Desplome sostenido (< -5% sin rebote)
-        elif neto < -0.05 and baja < -0.02:
-            patrones.append((ts, "Desplome sostenido"))
-
-        # Desplome falso (< -5% y rebote rápido)
-        elif sube < -0.05 and baja > 0.04:
-            patrones.append((ts, "Desplome falso"))
-
-        # Toque en el fondo y rebote fuerte
-        elif sube < -0.03 and baja > 0.06:
-            patrones.append((ts, "Fondo con rebote"))
+def detectar_patrones(df):
+    """
+    Para cada vela i (con 30 velas antes y después) compara los cierres
+    p0 = i-1, p1 = i+5 y p2 = i+29, en una sola pasada vectorizada.
+    Retorna una lista de (timestamp, patrón) en orden cronológico.
+    """
+    precios = df["close"].values
+    idx = np.arange(30, len(df) - 30)
+    if len(idx) == 0:
+        return []
+
+    p0 = precios[idx - 1]
+    p1 = precios[idx + 5]
+    p2 = precios[idx + 29]
+
+    # Cambio acumulado
+    sube = (p1 - p0) / p0
+    baja = (p2 - p1) / p1
+    neto = (p2 - p0) / p0
+
+    # np.select toma la primera regla que se cumple, igual que la cadena de elif
+    condiciones = [regla(sube, baja, neto) for _, regla in REGLAS]
+    etiquetas = np.select(condiciones, [nombre for nombre, _ in REGLAS], default="")
+
+    detectado = etiquetas != ""
+    timestamps = df["timestamp"].iloc[idx[detectado]]
+    return list(zip(timestamps, etiquetas[detectado].tolist()))
 
-        # Pico y caída fuerte
-        elif sube > 0.04 and baja < -0.06:
-            patrones.append((ts, "Pico y caída"))
+# === EJECUCIÓN ===
+# (bajo __main__: detectar_patrones se puede importar sin leer el CSV)
+if __name__ == "__main__":
+    # === CARGA DE DATOS ===
+    df = read_candles_csv("data/historical_data/PEPEUSDT_1m.csv", usecols=["timestamp", "close"])
+    df = df.sort_values("timestamp")
 
-    return patrones
+    # Filtramos últimos 60 días
+    df = df[df["timestamp"] >= df["timestamp"].max() - timedelta(days=700)]
 
-# === EJECUCIÓN ===
-patrones_detectados = detectar_patrones(df)
+    patrones_detectados = detectar_patrones(df)
 
-# Mostrar y guardar resultados
-if not os.path.exists("results"):
-    os.makedirs("results")
+    # Mostrar y guardar resultados
+    if not os.path.exists("results"):
+        os.makedirs("results")
 
-result_path = "../results/patrones_detectados.csv"
-df_result = pd.DataFrame(patrones_detectados, columns=["timestamp", "patron"])
-df_result.to_csv(result_path, index=False)
+    result_path = "../results/patrones_detectados.csv"
+    df_result = pd.DataFrame(patrones_detectados, columns=["timestamp", "patron"])
+    df_result.to_csv(result_path, index=False)
 
-print(f"Se detectaron {len(patrones_detectados)} patrones:")
-for ts, patron in patrones_detectados:
-    print(f"{ts} - {patron}")
+    print(f"Se detectaron {len(patrones_detectados)} patrones:")
+    for ts, patron in patrones_detectados:
+        print(f"{ts} - {patron}")
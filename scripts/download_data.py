@@ -1,25 +1,7 @@
-import ccxt
-import pandas as pd
-from datetime import datetime, timedelta
-import os
+from scripts.async_download import download_ohlcv
 
-def download_binance_ohlcv(symbol="PEPE/USDT", timeframe="1m", since_days=720):
-    exchange = ccxt.binance()
-    since = exchange.parse8601((datetime.utcnow() - timedelta(days=since_days)).isoformat())
-    all_ohlcv = []
-    limit = 1000
-
-    while True:
-        ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
-        if not ohlcv:
-            break
-        all_ohlcv += ohlcv
-        since = ohlcv[-1][0] + 1
-        if len(ohlcv) < limit:
-            break
 
-    df = pd.DataFrame(all_ohlcv, columns=["timestamp", "open", "high", "low", "close", "volume"])
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    os.makedirs("data/historical_data", exist_ok=True)
-    df.to_csv(f"data/historical_data/{symbol.replace('/', '')}_{timeframe}.csv", index=False)
-    print(f"[\u2713] {symbol} - {timeframe} descargado.")
\ No newline at end of file
+def download_binance_ohlcv(symbol="PEPE/USDT", timeframe="1m", since_days=720):
+    # Páginas pedidas en paralelo con rate limit (scripts/async_download.py);
+    # rehace el almacén columnar y el CSV espejo
+    return download_ohlcv(symbol, timeframe, since_days)
@@ -1,76 +1,72 @@
+import gc
 import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from stable_baselines3 import PPO
-from env.candle_env import CandlePredictionEnv
+from scripts.evaluation_engine import get_predictions, predictions_at
+from scripts.features import split_point
+from scripts.spans import span
 
-def evaluate_agent(model_path, data, predict_steps=3, tf_name="", show_plot=False):
+def evaluate_agent(model_path, data, predict_steps=3, tf_name="", show_plot=False, predictions=None):
     """
     Evalúa el modelo sobre el 20% final del dataset, simulando paso a paso
     una predicción en tiempo real, graficando vs los valores reales.
     Guarda los valores de rewards en un dataframe
     """
     os.makedirs("results", exist_ok=True)
-    data = data.copy().reset_index(drop=True)
 
     # Validar columnas necesarias
     if "return" not in data.columns or "volume" not in data.columns:
         raise ValueError("❌ El dataset debe contener columnas 'return' y 'volume'")
 
-    test_start = int(len(data) * 0.8)
-    test_data = data.iloc[test_start:].reset_index(drop=True)
+    # El 20% final como rango de filas (vista de la columna, sin copiar el dataset)
+    test_start = split_point(len(data))
+    returns = data["return"].to_numpy()[test_start:]
 
-    model = PPO.load(model_path)
-    env = CandlePredictionEnv(test_data, predict_steps=predict_steps)
+    # Predicciones de una sola pasada (cacheadas por modelo+datos en el motor de evaluación)
+    if predictions is None:
+        predictions = get_predictions(model_path, data, predict_steps=predict_steps)
 
     all_rewards = []
     #rewards_dict = {}
 
-    for i in range(predict_steps):
-        predictions = []
-        reals = []
-        rewards = []
-        positions = range(10, len(test_data) - predict_steps)
-
-        for pos in positions:
-            env.position = pos
-            obs = env._get_obs()
-            action, _ = model.predict(obs, deterministic=True)
-
-            true_returns = test_data.iloc[pos:pos + predict_steps]["return"].values
-
-            if len(true_returns) <= i:
-                continue
-
-            reward = - (action[i] - true_returns[i]) ** 2
+    positions = np.arange(10, len(returns) - predict_steps)
+    actions = predictions_at(predictions, positions, offset=test_start)
+    true_matrix = np.stack([returns[positions + i] for i in range(predict_steps)], axis=1)
 
-            predictions.append(action[i])
-            reals.append(true_returns[i])
-            rewards.append(reward)
-
-        # Graficar solo las últimas 50 predicciones
-        plt.figure(figsize=(14, 6))
-        plt.plot(predictions[:], label="Predicción", color="blue")
-        plt.plot(reals[:], label="Real", color="green")
-
-        # Agregar evolución de reward acumulado
-        reward_cumsum = np.cumsum(rewards[-50:])
-        plt.plot(reward_cumsum, label="Reward acumulado", color="red", linestyle="--")
-
-        plt.title(f"{tf_name} - Vela futura #{i+1}")
-        plt.xlabel("Timestep")
-        plt.ylabel("Variación / Reward")
-        plt.legend()
-        plt.grid(True)
-        plt.tight_layout()
+    for i in range(predict_steps):
+        predictions = actions[:, i]
+        reals = true_matrix[:, i]
+        rewards = - (predictions - reals) ** 2
+
+        # Span de graficado (no-op si main no activó los spans)
+        with span("plot", timeframe=tf_name, vela=i + 1) as plot_span:
+            plot_span["rows"] = len(reals)
+            # Graficar solo las últimas 50 predicciones
+            plt.figure(figsize=(14, 6))
+            plt.plot(predictions[:], label="Predicción", color="blue")
+            plt.plot(reals[:], label="Real", color="green")
+
+            # Agregar evolución de reward acumulado
+            reward_cumsum = np.cumsum(rewards[-50:])
+            plt.plot(reward_cumsum, label="Reward acumulado", color="red", linestyle="--")
+
+            plt.title(f"{tf_name} - Vela futura #{i+1}")
+            plt.xlabel("Timestep")
+            plt.ylabel("Variación / Reward")
+            plt.legend()
+            plt.grid(True)
+            plt.tight_layout()
         
-        # Guardar imagen
-        save_path = f"results/eval_{tf_name}_step{i+1}.png"
-        plt.savefig(save_path)
-        if show_plot:
-            plt.show()
-        plt.close()
+            # Guardar imagen
+            save_path = f"results/eval_{tf_name}_step{i+1}.png"
+            plt.savefig(save_path)
+            if show_plot:
+                plt.show()
+            plt.close()
+            # La figura queda en ciclos de referencias: se libera ya (generaciones jóvenes,
+            # ~10 ms) en lugar de acumular cientos de MB hasta el próximo ciclo del GC
+            gc.collect(1)
 
         cumulative_reward = np.sum(rewards)
         print(f"\n🎯 Reward acumulado en {len(rewards)} pasos (Vela #{i+1}): {cumulative_reward:.6f}\n")
@@ -1,73 +1,68 @@
+import gc
 import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from stable_baselines3 import PPO
-from env.candle_env import CandlePredictionEnv
+from scripts.evaluation_engine import get_predictions, predictions_at
+from scripts.features import split_point
+from scripts.spans import span
 
-def evaluate_agent_direction(model_path, data, predict_steps=3, tf_name="", show_plot=False):
+def evaluate_agent_direction(model_path, data, predict_steps=3, tf_name="", show_plot=False, predictions=None):
     """
     Evalúa si el modelo acierta la dirección (sube/baja) para cada vela futura.
     Asigna +1 si acierta la dirección, -1 si falla.
     Genera gráficos y retorna un DataFrame con rewards acumulados.
     """
     os.makedirs("results", exist_ok=True)
-    data = data.copy().reset_index(drop=True)
 
     # Validación de columnas necesarias
     if "return" not in data.columns or "volume" not in data.columns:
         raise ValueError("❌ El dataset debe contener columnas 'return' y 'volume'")
     
-    test_start = int(len(data) * 0.8)
-    test_data = data.iloc[test_start:].reset_index(drop=True)
+    # El 20% final como rango de filas (vista de la columna, sin copiar el dataset)
+    test_start = split_point(len(data))
+    returns = data["return"].to_numpy()[test_start:]
 
-    model = PPO.load(model_path)
-    env = CandlePredictionEnv(test_data, predict_steps=predict_steps)
+    # Predicciones de una sola pasada (cacheadas por modelo+datos en el motor de evaluación)
+    if predictions is None:
+        predictions = get_predictions(model_path, data, predict_steps=predict_steps)
 
     all_rewards = []
 
-    for i in range(predict_steps):
-        predictions = []
-        reals = []
-        rewards = []
-        positions = range(10, len(test_data) - predict_steps)
-
-        for pos in positions:
-            env.position = pos
-            obs = env._get_obs()
-            action, _ = model.predict(obs, deterministic=True)
-            true_returns = test_data.iloc[pos:pos + predict_steps]["return"].values
-
-            if len(true_returns) <= i:
-                continue
+    positions = np.arange(10, len(returns) - predict_steps)
+    actions = predictions_at(predictions, positions, offset=test_start)
+    true_matrix = np.stack([returns[positions + i] for i in range(predict_steps)], axis=1)
 
-            pred = action[i]
-            real = true_returns[i]
-
-            reward = 1 if np.sign(pred) == np.sign(real) else -1
-            #reward = 2 if np.sign(pred) == np.sign(real) else -1 #posible tunning para exloracion
+    for i in range(predict_steps):
+        predictions = actions[:, i]
+        reals = true_matrix[:, i]
 
-            predictions.append(pred)
-            reals.append(real)
-            rewards.append(reward)
+        rewards = np.where(np.sign(predictions) == np.sign(reals), 1, -1)
+        #rewards = np.where(np.sign(predictions) == np.sign(reals), 2, -1) #posible tunning para exloracion
 
-        # Gráfico
-        plt.figure(figsize=(14, 6))
-        plt.plot(np.sign(predictions[:]), label="Dirección Predicha", color="blue")
-        plt.plot(np.sign(reals[:]), label="Dirección Real", color="green")
-        plt.plot(np.cumsum(rewards[:]), label="Reward acumulado", color="red", linestyle="--")
-        plt.title(f"{tf_name} - Dirección correcta Vela #{i+1}")
-        plt.xlabel("Timestep")
-        plt.ylabel("Señal / Reward")
-        plt.legend()
-        plt.grid(True)
-        plt.tight_layout()
+        # Span de graficado (no-op si main no activó los spans)
+        with span("plot", timeframe=tf_name, vela=i + 1) as plot_span:
+            plot_span["rows"] = len(reals)
+            # Gráfico
+            plt.figure(figsize=(14, 6))
+            plt.plot(np.sign(predictions[:]), label="Dirección Predicha", color="blue")
+            plt.plot(np.sign(reals[:]), label="Dirección Real", color="green")
+            plt.plot(np.cumsum(rewards[:]), label="Reward acumulado", color="red", linestyle="--")
+            plt.title(f"{tf_name} - Dirección correcta Vela #{i+1}")
+            plt.xlabel("Timestep")
+            plt.ylabel("Señal / Reward")
+            plt.legend()
+            plt.grid(True)
+            plt.tight_layout()
         
-        save_path = f"results/direction_{tf_name}_step{i+1}.png"
-        plt.savefig(save_path)
-        if show_plot:
-            plt.show()
-        plt.close()
+            save_path = f"results/direction_{tf_name}_step{i+1}.png"
+            plt.savefig(save_path)
+            if show_plot:
+                plt.show()
+            plt.close()
+            # La figura queda en ciclos de referencias: se libera ya (generaciones jóvenes,
+            # ~10 ms) en lugar de acumular cientos de MB hasta el próximo ciclo del GC
+            gc.collect(1)
 
         cumulative_reward = np.sum(rewards)
         print(f"\n✨ Direcciones acertadas acumuladas (Vela #{i+1}): {cumulative_reward} de {len(rewards)}")
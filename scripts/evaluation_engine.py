@@ -0,0 +1,98 @@
+import hashlib
+import os
+import re
+import numpy as np
+from scripts.features import build_observations
+from scripts.predict import PREDICT_BATCH_SIZE, WINDOW_SIZE, predict_batch, load_model
+
+CACHE_DIR = "results/prediction_cache"
+
+# Cache en memoria para no releer el .npy dentro de la misma corrida
+_memory_cache = {}
+# Formato de clave anterior (sin nombre de modelo): ya no se lee nunca
+_LEGACY_CACHE_FILE = re.compile(r"preds_[0-9a-f]{16}_[0-9a-f]{16}_s\d+\.npy")
+
+
+def model_fingerprint(model_path):
+    """Hash SHA-256 del .zip del modelo (cambia si se reentrena)."""
+    zip_path = model_path if model_path.endswith(".zip") else f"{model_path}.zip"
+    sha = hashlib.sha256()
+    with open(zip_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def data_fingerprint(data):
+    """Hash SHA-256 de las columnas, dtypes y valores del dataset de features."""
+    sha = hashlib.sha256()
+    sha.update(",".join(f"{c}:{data[c].dtype}" for c in data.columns).encode())
+    for column in data.columns:
+        # Cada columna de la matriz canónica es contigua: se hashea sin copiarla
+        sha.update(np.ascontiguousarray(data[column].to_numpy()))
+    return sha.hexdigest()
+
+
+def _evict_stale(cache_dir, name, key, predict_steps):
+    """
+    Borra las predicciones cacheadas del mismo modelo y steps con otra clave
+    (datos actualizados o modelo reentrenado): sólo sirve la última.
+    """
+    stale = re.compile(rf"preds_{re.escape(name)}_[0-9a-f]{{16}}_[0-9a-f]{{16}}_s{predict_steps}\.npy")
+    for file_name in os.listdir(cache_dir):
+        if file_name != f"preds_{key}.npy" and (stale.fullmatch(file_name) or _LEGACY_CACHE_FILE.fullmatch(file_name)):
+            try:
+                os.remove(os.path.join(cache_dir, file_name))
+            except FileNotFoundError:
+                pass
+    for cached in [k for k in _memory_cache if k != key and stale.fullmatch(f"preds_{k}.npy")]:
+        del _memory_cache[cached]
+
+
+def get_predictions(model_path, data, predict_steps=3, cache_dir=CACHE_DIR):
+    """
+    Predicciones determinísticas del modelo para TODAS las ventanas del dataset.
+    La fila k corresponde a position = k + 10 (ventana data[k:k+10]).
+
+    Se calculan una sola vez por (hash del modelo, hash de los datos, steps) y
+    quedan guardadas en disco; si nada cambió se leen sin correr inferencia.
+    Al guardar una nueva se borran las anteriores del mismo modelo y steps.
+    """
+    name = os.path.basename(model_path[:-4] if model_path.endswith(".zip") else model_path)
+    key = f"{name}_{model_fingerprint(model_path)[:16]}_{data_fingerprint(data)[:16]}_s{predict_steps}"
+    if key in _memory_cache:
+        return _memory_cache[key]
+
+    cache_path = os.path.join(cache_dir, f"preds_{key}.npy")
+    if os.path.exists(cache_path):
+        actions = np.load(cache_path)
+    else:
+        # Observaciones por lotes directo desde la matriz de features: nunca se
+        # arma el tensor (n, 50) completo del dataset (200 bytes por vela)
+        model = load_model(model_path)
+        values = data.to_numpy(dtype=np.float32)
+        columns = list(data.columns)
+        n_windows = max(len(values) - WINDOW_SIZE + 1, 0)
+        chunks = [
+            predict_batch(model, build_observations(values[i:i + PREDICT_BATCH_SIZE + WINDOW_SIZE - 1], columns, WINDOW_SIZE))
+            for i in range(0, n_windows, PREDICT_BATCH_SIZE)
+        ]
+        actions = np.concatenate(chunks) if chunks else predict_batch(model, values[:0])
+
+        # Escritura atómica: temporal + rename
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.tmp.npy"
+        np.save(tmp_path, actions)
+        os.replace(tmp_path, cache_path)
+        _evict_stale(cache_dir, name, key, predict_steps)
+
+    _memory_cache[key] = actions
+    return actions
+
+
+def predictions_at(predictions, positions, offset=0):
+    """
+    Selecciona las predicciones de `positions` (relativas a un sub-dataset que
+    empieza en la fila `offset` del dataset completo).
+    """
+    return predictions[np.asarray(positions) + offset - 10]
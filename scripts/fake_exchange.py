@@ -0,0 +1,58 @@
+import asyncio
+import math
+import random
+import time
+import ccxt
+from scripts.candle_store import timeframe_ms
+
+
+class FakeExchange:
+    """
+    Exchange local para probar las descargas sin red. Expone lo que usa el
+    downloader (fetch_ohlcv, milliseconds, close) y sirve velas sintéticas
+    determinísticas: el mismo timestamp siempre da la misma vela.
+    - latency: segundos por pedido (más un jitter de hasta `jitter`).
+    - fail_rate: probabilidad de responder RateLimitExceeded / NetworkError.
+    - max_limit: tope de velas por página, como el exchange real.
+    """
+
+    def __init__(self, now_ms=None, listing_ms=None, latency=0.05, jitter=0.02,
+                 fail_rate=0.0, max_limit=1000, seed=0):
+        self.now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        self.listing_ms = listing_ms if listing_ms is not None else self.now_ms - 1000 * 86_400_000
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.max_limit = max_limit
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def milliseconds(self):
+        return self.now_ms
+
+    @staticmethod
+    def candle(ts):
+        base = 1e-5 * (1 + 0.2 * math.sin(ts / 86_400_000) + 0.01 * math.sin(ts / 3_600_000))
+        return [ts, base, base * 1.002, base * 0.998, base * 1.001, 1e9 * (2 + math.cos(ts / 60_000))]
+
+    async def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=500):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency + self.jitter * self.random.random())
+            if self.random.random() < self.fail_rate:
+                raise self.random.choice([ccxt.RateLimitExceeded, ccxt.NetworkError])("fake exchange error")
+
+            step = timeframe_ms(timeframe)
+            since = self.listing_ms if since is None else max(since, self.listing_ms)
+            first = -(-since // step) * step  # primera vela alineada con ts >= since
+            limit = min(limit, self.max_limit)
+            return [self.candle(ts) for ts in range(first, self.now_ms + 1, step)[:limit]]
+        finally:
+            self.in_flight -= 1
+
+    async def close(self):
+        pass
@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from env.observations import volume_stats
+
+FEATURE_COLUMNS = ["return", "volume", "ema_9", "ema_21", "ema_trend_up"]
+EMA_SPANS = (9, 21)
+FEATURE_DTYPE = np.float32  # Las observaciones del agente son float32: no hace falta más precisión
+TRAIN_FRACTION = 0.8  # Primer 80% train, último 20% test
+
+
+def split_point(n_rows, train_fraction=TRAIN_FRACTION):
+    """Fila donde empieza el test: train = [0, split), test = [split, n_rows)."""
+    return int(n_rows * train_fraction)
+
+
+def feature_frame(values):
+    """
+    DataFrame de features sobre `values` (n, n_features) SIN copiar: un único
+    bloque float32, así .to_numpy(), los slices con iloc y cada columna son
+    vistas de la misma memoria.
+    """
+    return pd.DataFrame(values, columns=FEATURE_COLUMNS, copy=False)
+
+
+def windows_to_observations(windows, feature_columns):
+    """
+    Convierte ventanas float32 (n, n_features, window_size) en observaciones
+    (n, n_features * window_size): la ventana de cada columna concatenada en
+    orden, con el volumen normalizado dentro de cada ventana. Modifica `windows`.
+    """
+    # Normalizar volumen (por ventana, igual que en cada paso)
+    # No tocar ema_trend_up ni otras binarias
+    if "volume" in feature_columns and len(windows):
+        j = list(feature_columns).index("volume")
+        vol = windows[:, j, :]
+        mean, scale = volume_stats(vol)
+        windows[:, j, :] = (vol - mean) / scale
+
+    n, n_features, window_size = windows.shape
+    return windows.reshape(n, n_features * window_size)
+
+
+def build_observations(values, feature_columns, window_size=10):
+    """
+    Observaciones de todas las ventanas deslizantes de una matriz de features
+    (n_filas, n_features) -> (n_filas - window_size + 1, n_features * window_size).
+    """
+    values = np.asarray(values, dtype=np.float32).reshape(len(values), len(feature_columns))
+    n_windows = max(len(values) - window_size + 1, 0)
+    windows = np.empty((n_windows, len(feature_columns), window_size), dtype=np.float32)
+    if n_windows:
+        # (n_ventanas, n_features, window_size), copiado a memoria contigua
+        windows[:] = sliding_window_view(values, window_size, axis=0)[:n_windows]
+    return windows_to_observations(windows, feature_columns)
+
+
+def _compute_features(df):
+    """
+    Matriz de features (n_features, n) float32 y las EMAs en float64 (el
+    FeatureEngine arranca sus EMAs incrementales desde el valor exacto).
+    Los cálculos se hacen en float64; sólo el resultado se guarda en float32.
+    """
+    close = pd.Series(df["close"].to_numpy(dtype=np.float64))
+    ema_9 = close.ewm(span=9).mean().to_numpy()
+    ema_21 = close.ewm(span=21).mean().to_numpy()
+
+    values = np.empty((len(FEATURE_COLUMNS), len(close)), dtype=FEATURE_DTYPE)
+    values[0] = close.pct_change().fillna(0).to_numpy()
+    values[1] = df["volume"].to_numpy(dtype=np.float64)
+    values[2] = ema_9
+    values[3] = ema_21
+    values[4] = ema_9 > ema_21 #para más polarización usar np.where(ema_9 > ema_21, 1, -1)
+    return values, (ema_9, ema_21)
+
+
+def prepare_data(df):
+    """
+    Features que recibe el agente, recalculadas sobre todo el DataFrame
+    (columnas 'close' y 'volume'). Única implementación compartida.
+
+    Retorna la matriz canónica del timeframe: un solo bloque float32 (n, 5)
+    con cada feature contigua en memoria (layout columnar de pandas). El
+    resto del pipeline la usa por vistas: ni copias ni reset_index.
+    """
+    values, _ = _compute_features(df)
+    return feature_frame(values.T)
+
+
+class _EmaState:
+    """
+    EMA con adjust=True que replica paso a paso la recurrencia de pandas
+    (ewm(span).mean()), así el valor incremental es idéntico al recalculado.
+    """
+
+    def __init__(self, span):
+        alpha = 1.0 / (1.0 + (span - 1) / 2)
+        self.old_wt_factor = 1.0 - alpha
+        self.weighted = np.nan
+        self.old_wt = 1.0
+
+    def update(self, value):
+        if self.weighted != self.weighted:  # primera observación
+            self.weighted = value
+            return value
+        self.old_wt *= self.old_wt_factor
+        if self.weighted != value:
+            self.weighted = (self.old_wt * self.weighted + value) / (self.old_wt + 1.0)
+        self.old_wt += 1.0
+        return self.weighted
+
+    def warm_start(self, last_value, n_obs):
+        # El peso acumulado converge rápido: se itera hasta que deja de cambiar
+        self.weighted = last_value
+        self.old_wt = 1.0
+        for _ in range(n_obs - 1):
+            new_wt = self.old_wt * self.old_wt_factor + 1.0
+            if new_wt == self.old_wt:
+                break
+            self.old_wt = new_wt
+
+
+class FeatureEngine:
+    """
+    Motor de features incremental para una serie de velas de un timeframe.
+    - from_frame: calcula las columnas una sola vez para todo el histórico.
+    - append: agrega una vela y actualiza return/EMAs en O(1).
+    - features_asof: features de las últimas n velas con timestamp <= ts,
+      leídas de las columnas ya calculadas (mismo valor que recalcular
+      prepare_data sobre el histórico cortado en ts, porque todo es causal).
+    """
+
+    def __init__(self, capacity=1024):
+        self._n = 0
+        self._timestamps = np.empty(capacity, dtype="datetime64[ns]")
+        self._close = np.empty(capacity, dtype=np.float64)
+        self._features = np.empty((capacity, len(FEATURE_COLUMNS)), dtype=FEATURE_DTYPE)
+        self._emas = [_EmaState(span) for span in EMA_SPANS]
+        self._last_close = None
+
+    @classmethod
+    def from_frame(cls, df):
+        """Inicializa desde un DataFrame con 'timestamp', 'close' y 'volume' (ordenado)."""
+        n = len(df)
+        engine = cls(capacity=max(1024, 2 * n))
+        values, emas = _compute_features(df)
+        engine._timestamps[:n] = pd.to_datetime(df["timestamp"]).values
+        engine._close[:n] = df["close"].to_numpy(dtype=np.float64)
+        engine._features[:n] = values.T
+        engine._n = n
+        if n:
+            engine._last_close = engine._close[n - 1]
+            for ema, values_64 in zip(engine._emas, emas):
+                ema.warm_start(values_64[-1], n)
+        return engine
+
+    def __len__(self):
+        return self._n
+
+    def _grow(self):
+        capacity = 2 * len(self._close)
+        for name in ("_timestamps", "_close", "_features"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._n] = old[:self._n]
+            setattr(self, name, new)
+
+    def append(self, timestamp, close, volume):
+        """Agrega una vela cerrada y retorna su fila de features."""
+        if self._n == len(self._close):
+            self._grow()
+
+        close = float(close)
+        ret = 0.0 if self._last_close is None else close / self._last_close - 1
+        ema_9, ema_21 = (ema.update(close) for ema in self._emas)
+        row = (ret, float(volume), ema_9, ema_21, int(ema_9 > ema_21))
+
+        i = self._n
+        self._timestamps[i] = np.datetime64(pd.Timestamp(timestamp), "ns")
+        self._close[i] = close
+        self._features[i] = row
+        self._last_close = close
+        self._n += 1
+        return row
+
+    @property
+    def timestamps(self):
+        return self._timestamps[:self._n]
+
+    @property
+    def close(self):
+        return self._close[:self._n]
+
+    def index_asof(self, ts):
+        """Cantidad de velas con timestamp <= ts (búsqueda binaria)."""
+        return int(np.searchsorted(self.timestamps, np.datetime64(pd.Timestamp(ts), "ns"), side="right"))
+
+    def feature_values(self, end=None, n=None):
+        """Vista (sin copia) de las features de las filas [end - n, end)."""
+        end = self._n if end is None else end
+        start = 0 if n is None else max(end - n, 0)
+        return self._features[start:end]
+
+    def features_asof(self, ts, n=None):
+        """DataFrame de features de las últimas n velas con timestamp <= ts."""
+        return self.features_upto(self.index_asof(ts), n)
+
+    def features_upto(self, end, n=None):
+        """DataFrame de features de las filas [end - n, end) (p. ej. con índices de alineación ya calculados)."""
+        return self.to_frame(self.feature_values(end, n))
+
+    def features(self):
+        return self.to_frame(self.feature_values())
+
+    @staticmethod
+    def to_frame(values):
+        return feature_frame(values)
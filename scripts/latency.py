@@ -0,0 +1,54 @@
+from bisect import bisect_left
+
+# Límites superiores de los buckets en milisegundos (el último bucket es +inf)
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class LatencyHistogram:
+    """Histograma acumulativo de latencias (en ms) con buckets fijos, barato de actualizar."""
+
+    def __init__(self, buckets_ms=BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect_left(self.buckets_ms, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q):
+        """Cota superior del bucket donde cae el cuantil q (el máximo para el último)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets_ms, self.counts):
+            seen += n
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            "buckets_ms": list(self.buckets_ms),
+            "counts": list(self.counts),
+            "count": self.count,
+            "sum_ms": self.sum_ms,
+            "max_ms": self.max_ms,
+        }
+
+
+def format_latency_table(histograms):
+    """Tabla de texto: una fila por etapa con n, media, p50, p90, p99 y máximo (ms)."""
+    lines = [f"{'etapa':<12}{'n':>8}{'media':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}"]
+    for name, h in histograms.items():
+        mean = h.sum_ms / h.count if h.count else 0.0
+        lines.append(
+            f"{name:<12}{h.count:>8}{mean:>10.3f}{h.quantile(0.5):>10.3f}"
+            f"{h.quantile(0.9):>10.3f}{h.quantile(0.99):>10.3f}{h.max_ms:>10.3f}"
+        )
+    return "\n".join(lines)
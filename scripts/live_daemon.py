@@ -0,0 +1,258 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from scripts.backfill import classify_batch
+from scripts.candle_store import _to_ms, load_candles, read_candles_csv, timeframe_ms
+from scripts.features import FeatureEngine
+from scripts.latency import LatencyHistogram, format_latency_table
+from scripts.predict import Predictor
+from scripts.resample import resample_ohlcv
+
+TIMEFRAMES = ["1m", "3m", "5m", "15m", "1h", "1d"]
+MODEL_PATHS = {tf: f"models/ppo_predictor_{tf}" for tf in TIMEFRAMES}
+LOG_PATH = "results/live_predictions.jsonl"
+LATENCY_FILE = "live_latency.json"  # Se escribe en la carpeta del log
+STAGES = ["bars", "predict", "log", "total"]
+MINUTE_MS = 60_000
+
+
+# ======================= FEEDS =======================
+# Un feed es cualquier iterable de velas de 1m CERRADAS:
+# (timestamp_ms, open, high, low, close, volume), en orden.
+
+class ReplayFeed:
+    """
+    Reproduce velas de 1m desde un DataFrame/CSV. speed = velocidad relativa al
+    tiempo real (60 = un minuto por segundo); None o 0 = lo más rápido posible.
+    """
+
+    def __init__(self, candles, speed=None):
+        self.candles = read_candles_csv(candles) if isinstance(candles, str) else candles
+        self.speed = speed
+
+    def __iter__(self):
+        ts = _to_ms(self.candles["timestamp"])
+        values = self.candles[["open", "high", "low", "close", "volume"]].to_numpy(dtype=np.float64)
+        delay = MINUTE_MS / 1000 / self.speed if self.speed else 0
+        for t, row in zip(ts, values):
+            if delay:
+                time.sleep(delay)
+            yield (int(t), *row)
+
+
+class ExchangeFeed:
+    """
+    Velas de 1m cerradas desde el exchange: pide lo posterior a la última vela
+    entregada y, cuando está al día, duerme hasta el próximo cierre.
+    """
+
+    def __init__(self, symbol="PEPE/USDT", since_ms=None, poll_seconds=1.0, exchange=None):
+        self.symbol = symbol
+        self.last_ms = since_ms
+        self.poll_seconds = poll_seconds
+        self.exchange = exchange
+
+    def __iter__(self):
+        import ccxt  # sólo el modo en vivo necesita el cliente del exchange
+
+        exchange = self.exchange or ccxt.binance()
+        while True:
+            try:
+                since = None if self.last_ms is None else self.last_ms + 1
+                rows = exchange.fetch_ohlcv(self.symbol, "1m", since=since, limit=1000)
+            except ccxt.NetworkError as e:
+                print(f"⚠️  Feed: {type(e).__name__}, reintentando en {self.poll_seconds}s")
+                time.sleep(self.poll_seconds)
+                continue
+
+            now = exchange.milliseconds()
+            closed = [r for r in rows if r[0] + MINUTE_MS <= now]
+            for row in closed:
+                self.last_ms = row[0]
+                yield tuple(row)
+            if len(closed) == len(rows) and len(rows) == 1000:
+                continue  # Poniéndose al día: pedir la siguiente página ya
+            wait_ms = (self.last_ms + 2 * MINUTE_MS - now) if self.last_ms is not None else 0
+            time.sleep(max(self.poll_seconds, wait_ms / 1000))
+
+
+# ================ VELAS DE TIMEFRAMES MAYORES ================
+class _BarBuilder:
+    """Arma la vela en curso de un timeframe a partir de las velas de 1m cerradas."""
+
+    def __init__(self, timeframe):
+        self.step = timeframe_ms(timeframe)
+        self.bar = None  # [bucket, open, high, low, close, volume]
+
+    def add(self, ts, o, h, l, c, v):
+        """Agrega una vela de 1m; retorna la lista de velas que quedaron cerradas."""
+        closed = []
+        bucket = ts - ts % self.step
+        if self.bar is not None and self.bar[0] != bucket:
+            closed.append(tuple(self.bar))  # Hueco en los datos: la vela anterior cerró incompleta
+            self.bar = None
+        if self.bar is None:
+            self.bar = [bucket, o, h, l, c, v]
+        else:
+            self.bar[2] = max(self.bar[2], h)
+            self.bar[3] = min(self.bar[3], l)
+            self.bar[4] = c
+            self.bar[5] += v
+        if (ts + MINUTE_MS) % self.step == 0:
+            closed.append(tuple(self.bar))
+            self.bar = None
+        return closed
+
+
+# ========================= DAEMON =========================
+class LiveDaemon:
+    """
+    Predicción en vivo para todos los timeframes.
+    - Arranca desde un histórico de 1m (velas cerradas): las velas de cada
+      timeframe salen de agregar 1m (como scripts/resample.py) y la vela aún
+      abierta queda en un _BarBuilder.
+    - Por cada vela de 1m cerrada: actualiza las velas/features de los
+      timeframes que cierran (FeatureEngine.append, O(1)), predice sólo esos
+      (el resto reutiliza su última predicción), y agrega un registro JSON al log.
+    - Sólo se usan velas cerradas: nunca la vela en curso del timeframe.
+    """
+
+    def __init__(self, history_1m, timeframes=TIMEFRAMES, model_paths=MODEL_PATHS, log_path=LOG_PATH, latency_path=None):
+        self.timeframes = list(timeframes)
+        self.predictors = {tf: Predictor(model_paths[tf]) for tf in self.timeframes}
+        self.engines = {}
+        self.builders = {}
+        self.predictions = {}
+        self.latency = {stage: LatencyHistogram() for stage in STAGES}
+
+        last_ts = int(_to_ms(history_1m["timestamp"])[-1]) if len(history_1m) else None
+        for tf in self.timeframes:
+            if tf == "1m":
+                self.engines[tf] = FeatureEngine.from_frame(history_1m)
+                continue
+            builder = _BarBuilder(tf)
+            bars = resample_ohlcv(history_1m, tf, drop_partial_head=True)
+            if len(bars):
+                bar_ts = int(_to_ms(bars["timestamp"].iloc[-1:])[0])
+                if bar_ts + builder.step > last_ts + MINUTE_MS:  # Última vela todavía abierta
+                    builder.bar = [bar_ts, *bars.iloc[-1][["open", "high", "low", "close", "volume"]]]
+                    bars = bars.iloc[:-1]
+            self.engines[tf] = FeatureEngine.from_frame(bars)
+            self.builders[tf] = builder
+
+        for tf in self.timeframes:
+            self.predictors[tf].model  # Carga (y cachea) la política antes del primer cierre
+            self._predict(tf)
+
+        log_dir = os.path.dirname(log_path) or "."
+        os.makedirs(log_dir, exist_ok=True)
+        self.log = open(log_path, "a", buffering=1)
+        self.latency_path = latency_path or os.path.join(log_dir, LATENCY_FILE)
+
+    def _predict(self, tf):
+        engine = self.engines[tf]
+        n = len(engine)
+        if n < 20:
+            self.predictions[tf] = None
+            return
+        window = engine.feature_values(n - 10, 10)  # Misma ventana que predict(): data[-20:-10]
+        self.predictions[tf] = self.predictors[tf].predict_window(window)
+
+    def process(self, candle):
+        """Procesa una vela de 1m cerrada; retorna el registro escrito en el log."""
+        t0 = time.perf_counter()
+        ts, o, h, l, c, v = candle
+
+        updated = ["1m"] if "1m" in self.engines else []
+        if updated:
+            self.engines["1m"].append(pd.Timestamp(ts, unit="ms"), c, v)
+        for tf, builder in self.builders.items():
+            for bar in builder.add(ts, o, h, l, c, v):
+                self.engines[tf].append(pd.Timestamp(bar[0], unit="ms"), bar[4], bar[5])
+                updated.append(tf)
+        t1 = time.perf_counter()
+
+        for tf in dict.fromkeys(updated):
+            self._predict(tf)
+        preds = {tf: self.predictions[tf] for tf in self.timeframes}
+        t2 = time.perf_counter()
+
+        patterns = {
+            tf: int(classify_batch(p[None, :3])[0]) if p is not None else 0
+            for tf, p in preds.items()
+        }
+        record = {
+            "timestamp": str(pd.Timestamp(ts, unit="ms")),
+            "close": float(c),
+            "patterns": patterns,
+            "predictions": {tf: None if p is None else [float(x) for x in p] for tf, p in preds.items()},
+            "updated": list(dict.fromkeys(updated)),
+        }
+        self.log.write(json.dumps(record) + "\n")
+        t3 = time.perf_counter()
+
+        for stage, seconds in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t3 - t0)):
+            self.latency[stage].observe(seconds * 1000)
+        return record
+
+    def run(self, feed, report_every=60, max_candles=None):
+        n = 0
+        try:
+            for candle in feed:
+                record = self.process(candle)
+                n += 1
+                if report_every and n % report_every == 0:
+                    total = self.latency["total"]
+                    print(
+                        f"⏱️  {record['timestamp']} | {n} velas | total p50 {total.quantile(0.5):.3f} ms"
+                        f" p99 {total.quantile(0.99):.3f} ms | patrones {record['patterns']}"
+                    )
+                if max_candles and n >= max_candles:
+                    break
+        except KeyboardInterrupt:
+            print("\n🛑 Daemon detenido")
+        finally:
+            self.close()
+        return n
+
+    def close(self):
+        if not self.log.closed:
+            self.log.close()
+        print("\n📊 Latencias por etapa (ms):")
+        print(format_latency_table(self.latency))
+        with open(self.latency_path, "w") as f:
+            json.dump({stage: h.to_dict() for stage, h in self.latency.items()}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daemon de predicción en vivo (todos los timeframes)")
+    parser.add_argument("--replay", help="CSV de velas de 1m a reproducir en lugar del exchange")
+    parser.add_argument("--start", help="Inicio de la reproducción (por defecto: último día del CSV)")
+    parser.add_argument("--speed", type=float, default=0, help="Velocidad de reproducción (0 = máxima)")
+    parser.add_argument("--log", default=LOG_PATH, help="Log append-only de predicciones (JSONL)")
+    parser.add_argument("--latency", help=f"JSON de latencias por etapa (por defecto: {LATENCY_FILE} en la carpeta del log)")
+    args = parser.parse_args()
+
+    if args.replay:
+        candles = read_candles_csv(args.replay)
+        start = pd.Timestamp(args.start) if args.start else candles["timestamp"].iloc[-1] - pd.Timedelta(days=1)
+        history = candles[candles["timestamp"] < start].reset_index(drop=True)
+        feed = ReplayFeed(candles[candles["timestamp"] >= start], speed=args.speed)
+    else:
+        history = load_candles("PEPE/USDT", "1m")
+        # La última vela del almacén puede estar todavía abierta
+        now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+        history = history[history["timestamp"] + pd.Timedelta(minutes=1) <= now].reset_index(drop=True)
+        feed = ExchangeFeed("PEPE/USDT", since_ms=int(_to_ms(history["timestamp"].iloc[-1:])[0]))
+
+    print(f"🚀 Daemon iniciado con {len(history)} velas de historia")
+    daemon = LiveDaemon(history, log_path=args.log, latency_path=args.latency)
+    n = daemon.run(feed)
+    print(f"✅ {n} velas procesadas. Log: {args.log} | latencias: {daemon.latency_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+from scripts.candle_store import load_candles
+
+TIMEFRAMES = ["1m", "3m", "5m", "15m", "1h", "1d"]
+
+
+class MarketData:
+    """
+    Capa de acceso a velas de varios timeframes con timestamps ordenados.
+    Las consultas "últimas N velas al momento ts" y "rango [t0, t1]" usan
+    búsqueda binaria y retornan vistas (iloc sobre un rango contiguo), sin
+    máscaras booleanas sobre todo el DataFrame ni copias.
+    """
+
+    def __init__(self, frames, base_tf="1m"):
+        self.frames = {}
+        self._timestamps = {}
+        for tf, df in frames.items():
+            if not df["timestamp"].is_monotonic_increasing:
+                df = df.sort_values("timestamp", kind="stable")
+            df = df.reset_index(drop=True)
+            self.frames[tf] = df
+            self._timestamps[tf] = df["timestamp"].values
+        self.base_tf = base_tf
+        self._alignment = {}
+
+    @classmethod
+    def load(cls, symbol="PEPE/USDT", timeframes=TIMEFRAMES, base_tf="1m"):
+        return cls({tf: load_candles(symbol, tf) for tf in timeframes}, base_tf=base_tf)
+
+    def __getitem__(self, tf):
+        return self.frames[tf]
+
+    @staticmethod
+    def _ts(ts):
+        return np.datetime64(pd.Timestamp(ts), "ns")
+
+    def index_asof(self, tf, ts):
+        """Cantidad de velas de `tf` con timestamp <= ts."""
+        return int(np.searchsorted(self._timestamps[tf], self._ts(ts), side="right"))
+
+    def index_of(self, tf, ts):
+        """Índice de la vela con timestamp == ts, o None si no existe."""
+        timestamps = self._timestamps[tf]
+        i = int(np.searchsorted(timestamps, self._ts(ts), side="left"))
+        return i if i < len(timestamps) and timestamps[i] == self._ts(ts) else None
+
+    def asof(self, tf, ts, n=None):
+        """Últimas n velas (todas si n=None) con timestamp <= ts. Vista, sin copia."""
+        end = self.index_asof(tf, ts)
+        start = 0 if n is None else max(end - n, 0)
+        return self.frames[tf].iloc[start:end]
+
+    def range(self, tf, t0, t1, closed="both"):
+        """
+        Velas con t0 <= timestamp <= t1 (closed="both") o t0 < timestamp <= t1
+        (closed="right"). Vista, sin copia.
+        """
+        timestamps = self._timestamps[tf]
+        lo = np.searchsorted(timestamps, self._ts(t0), side="left" if closed == "both" else "right")
+        hi = np.searchsorted(timestamps, self._ts(t1), side="right")
+        return self.frames[tf].iloc[lo:hi]
+
+    def alignment(self, tf):
+        """
+        Array (len(base_tf),) con el índice de la vela de `tf` que contiene a
+        cada vela base (la última con timestamp <= timestamp base); -1 si no hay.
+        Se calcula una sola vez por timeframe.
+        """
+        if tf not in self._alignment:
+            self._alignment[tf] = (
+                np.searchsorted(self._timestamps[tf], self._timestamps[self.base_tf], side="right") - 1
+            )
+        return self._alignment[tf]
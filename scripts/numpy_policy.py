@@ -0,0 +1,121 @@
+import os
+import numpy as np
+
+# Este módulo NO importa torch ni stable_baselines3 a nivel de módulo:
+# las herramientas que sólo predicen cargan el .npz y arrancan al instante.
+
+ACTIVATIONS = {
+    "Tanh": np.tanh,
+    "ReLU": lambda x: np.maximum(x, 0),
+    "Identity": lambda x: x,
+}
+
+
+def _zip_path(model_path):
+    return model_path if model_path.endswith(".zip") else f"{model_path}.zip"
+
+
+def numpy_policy_path(model_path):
+    """models/ppo_predictor_1m(.zip) -> models/ppo_predictor_1m.npz"""
+    base = model_path[:-4] if model_path.endswith(".zip") else model_path
+    return f"{base}.npz"
+
+
+def export_numpy_policy(model_path, out_path=None):
+    """
+    Exporta el camino determinístico del actor de un PPO (MLP de la política +
+    action_net + clipping al action_space) a un .npz compacto, sin optimizador
+    ni red de valor.
+    """
+    from stable_baselines3 import PPO  # torch sólo hace falta para exportar
+
+    zip_path = _zip_path(model_path)
+    out_path = out_path or numpy_policy_path(model_path)
+    model = PPO.load(zip_path, device="cpu")
+    policy = model.policy
+
+    if type(policy.features_extractor).__name__ != "FlattenExtractor" or policy.squash_output:
+        raise ValueError("❌ Sólo se exportan políticas MlpPolicy sin squash_output")
+
+    arrays = {}
+    activations = []
+    n_layers = 0
+    for module in policy.mlp_extractor.policy_net:
+        name = type(module).__name__
+        if name == "Linear":
+            arrays[f"W{n_layers}"] = module.weight.detach().cpu().numpy().astype(np.float32)
+            arrays[f"b{n_layers}"] = module.bias.detach().cpu().numpy().astype(np.float32)
+            activations.append("Identity")
+            n_layers += 1
+        elif name in ACTIVATIONS:
+            activations[-1] = name
+        else:
+            raise ValueError(f"❌ Capa no soportada en la exportación: {name}")
+
+    arrays[f"W{n_layers}"] = policy.action_net.weight.detach().cpu().numpy().astype(np.float32)
+    arrays[f"b{n_layers}"] = policy.action_net.bias.detach().cpu().numpy().astype(np.float32)
+    activations.append("Identity")
+
+    # Escritura atómica: temporal + rename
+    tmp_path = f"{out_path}.tmp.npz"
+    np.savez(
+        tmp_path,
+        activations=np.array(activations),
+        action_low=model.action_space.low.astype(np.float32),
+        action_high=model.action_space.high.astype(np.float32),
+        source_mtime=np.float64(os.path.getmtime(zip_path)),
+        **arrays,
+    )
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+class NumpyPolicy:
+    """
+    Inferencia en NumPy puro equivalente a model.predict(obs, deterministic=True).
+    Misma interfaz que PPO.predict: retorna (acciones, None).
+    """
+
+    def __init__(self, path):
+        with np.load(path) as f:
+            activations = [str(a) for a in f["activations"]]
+            self.layers = [
+                (f[f"W{i}"].T.copy(), f[f"b{i}"], ACTIVATIONS[act])
+                for i, act in enumerate(activations)
+            ]
+            self.action_low = f["action_low"]
+            self.action_high = f["action_high"]
+            self.source_mtime = float(f["source_mtime"])
+        self.action_shape = self.action_low.shape
+
+    def predict(self, observation, deterministic=True):
+        obs = np.asarray(observation, dtype=np.float32)
+        single = obs.ndim == 1
+        x = obs.reshape(1, -1) if single else obs
+        for weight, bias, activation in self.layers:
+            x = activation(x @ weight + bias)
+        actions = np.clip(x, self.action_low, self.action_high)
+        return (actions[0] if single else actions), None
+
+
+def load_numpy_policy(model_path):
+    """
+    NumpyPolicy si existe un .npz vigente para el modelo (exportado del .zip
+    actual, o sin .zip al lado); si no, None.
+    """
+    npz_path = numpy_policy_path(model_path)
+    if not os.path.exists(npz_path):
+        return None
+    policy = NumpyPolicy(npz_path)
+    zip_path = _zip_path(model_path)
+    if os.path.exists(zip_path) and os.path.getmtime(zip_path) != policy.source_mtime:
+        return None
+    return policy
+
+
+if __name__ == "__main__":
+    TIMEFRAMES = ["1m", "3m", "5m", "15m", "1h", "1d"]
+    for tf in TIMEFRAMES:
+        model_path = f"models/ppo_predictor_{tf}"
+        if os.path.exists(f"{model_path}.zip"):
+            print(f"📦 Exportado {export_numpy_policy(model_path)}")
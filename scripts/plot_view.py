@@ -0,0 +1,182 @@
+import numpy as np
+import matplotlib.dates as mdates
+from tkinter import ttk
+
+MARGIN = 0.25  # Margen de los límites fijos, en fracción del rango de los datos
+SHRINK = 0.5  # Se reajusta si los límites nuevos ocuparían menos de esta fracción de los actuales
+
+
+class PlotView:
+    """
+    Capa de dibujo para las GUIs de navegación: los artistas (líneas,
+    marcadores, líneas verticales) se crean una sola vez y en cada paso sólo
+    se actualizan sus datos.
+
+    - Los límites de los ejes son fijos: se recalculan (con MARGIN de sobra)
+      sólo cuando los datos se salen de la vista o la vista les queda grande.
+    - Si los límites y las líneas visibles no cambian, se redibujan sólo los
+      artistas (y el título, que cambia en cada paso) sobre el fondo guardado
+      (blitting).
+    - Si cambian, se hace un draw completo del canvas (ticks y leyenda nuevos)
+      y se vuelve a capturar el fondo.
+    - request(): junta varios pedidos de redibujo seguidos (clicks o teclas
+      repetidas) en uno solo, con los datos más recientes.
+    """
+
+    def __init__(self, fig, canvas, legend=True):
+        self.fig = fig
+        self.canvas = canvas
+        self.ax = fig.add_subplot(111)
+        self.ax.xaxis_date()
+        self.ax.grid()
+        self.legend = legend
+        self.title = self.ax.set_title("")
+        self.title.set_animated(True)
+        self.artists = {}
+        self._background = None
+        self._state = None
+        self._scheduled = False
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    # ---------- artistas ----------
+    def line(self, name, *args, **kwargs):
+        (artist,) = self.ax.plot([], [], *args, **kwargs)
+        artist.set_animated(True)
+        self.artists[name] = artist
+        return artist
+
+    def vline(self, name, **kwargs):
+        artist = self.ax.axvline(0, **kwargs)
+        artist.set_animated(True)
+        artist.set_visible(False)
+        self.artists[name] = artist
+        return artist
+
+    def set_line(self, name, x, y):
+        """Datos nuevos para una línea; x en datetimes. Sin datos la línea se oculta."""
+        artist = self.artists[name]
+        x = mdates.date2num(np.asarray(x, dtype="datetime64[ns]")) if len(x) else np.empty(0)
+        artist.set_data(x, np.asarray(y, dtype=np.float64))
+        artist.set_visible(len(x) > 0)
+
+    def set_vline(self, name, x):
+        artist = self.artists[name]
+        if x is None:
+            artist.set_visible(False)
+            return
+        xnum = mdates.date2num(np.datetime64(x, "ns"))
+        artist.set_xdata([xnum, xnum])
+        artist.set_visible(True)
+
+    # ---------- dibujo ----------
+    def _on_draw(self, event):
+        # Después de cada draw completo: guardar el fondo y pintar los artistas animados encima
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists.values():
+            if artist.get_visible():
+                self.fig.draw_artist(artist)
+        self.fig.draw_artist(self.title)
+
+    def _bounds(self):
+        lines = [a for a in self.artists.values() if a.get_visible() and len(a.get_xdata()) and a.get_transform() == self.ax.transData]
+        if not lines:
+            return None
+        x = np.concatenate([np.asarray(a.get_xdata(), dtype=np.float64) for a in lines])
+        y = np.concatenate([np.asarray(a.get_ydata(), dtype=np.float64) for a in lines])
+        x, y = x[np.isfinite(x)], y[np.isfinite(y)]
+        if not len(x) or not len(y):
+            return None
+        return (x.min(), x.max()), (y.min(), y.max())
+
+    @staticmethod
+    def _fit(lo, hi, flat_pad):
+        pad = (hi - lo) * MARGIN or flat_pad
+        return lo - pad, hi + pad
+
+    def _limits(self):
+        """Límites actuales si los datos siguen entrando con holgura; si no, unos nuevos."""
+        bounds = self._bounds()
+        current = self._state[0] if self._state else None
+        if bounds is None:
+            return current
+        (x_lo, x_hi), (y_lo, y_hi) = bounds
+        limits = (self._fit(x_lo, x_hi, 1 / 1440), self._fit(y_lo, y_hi, abs(y_hi) * 0.01 or 1e-9))
+        if current is None:
+            return limits
+        for (lo, hi), (new_lo, new_hi), (cur_lo, cur_hi) in zip(bounds, limits, current):
+            if lo < cur_lo or hi > cur_hi or new_hi - new_lo < SHRINK * (cur_hi - cur_lo):
+                return limits
+        return current
+
+    def update(self, title=""):
+        """Aplica los datos actuales: blit si alcanza, draw completo si no."""
+        limits = self._limits()
+        visible = tuple(name for name, a in self.artists.items() if a.get_visible())
+        state = (limits, visible)
+        self.title.set_text(title)
+
+        if state != self._state or self._background is None:
+            self._state = state
+            if limits is not None:
+                self.ax.set_xlim(*limits[0])
+                self.ax.set_ylim(*limits[1])
+            if self.legend:
+                handles = [self.artists[name] for name in visible]
+                self.ax.legend(handles=handles, labels=[h.get_label() for h in handles])
+            self.canvas.draw_idle()
+            return
+
+        self.canvas.restore_region(self._background)
+        self._draw_artists()
+        self.canvas.blit(self.fig.bbox)
+
+    def request(self, widget, callback):
+        """Programa `callback` para cuando Tk esté libre; pedidos repetidos se juntan."""
+        if self._scheduled:
+            return
+
+        def run():
+            self._scheduled = False
+            callback()
+
+        self._scheduled = True
+        widget.after_idle(run)
+
+
+def repeat_button(parent, text, command, delay_ms=400, interval_ms=60):
+    """
+    ttk.Button que repite `command` mientras se mantiene apretado (como una
+    tecla): primera ejecución al presionar, repeticiones cada interval_ms.
+    Con foco, espacio y Enter lo ejecutan una vez por pulsación (la repetición
+    la da el autorepeat del teclado).
+    """
+    button = ttk.Button(parent, text=text)
+    state = {"job": None}
+
+    def repeat(wait):
+        command()
+        state["job"] = button.after(wait, repeat, interval_ms)
+
+    def press(event):
+        if str(button.cget("state")) != "disabled":
+            repeat(delay_ms)
+
+    def release(event):
+        if state["job"] is not None:
+            button.after_cancel(state["job"])
+            state["job"] = None
+
+    def key(event):
+        if str(button.cget("state")) != "disabled":
+            command()
+        return "break"
+
+    button.bind("<ButtonPress-1>", press)
+    button.bind("<ButtonRelease-1>", release)
+    button.bind("<Leave>", release)
+    button.bind("<KeyPress-space>", key)
+    button.bind("<KeyPress-Return>", key)
+    return button
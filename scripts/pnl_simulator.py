@@ -0,0 +1,129 @@
+import gc
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from scripts.candle_store import timeframe_ms
+
+THRESHOLDS = (0.0, 0.0005, 0.001, 0.002, 0.003, 0.005, 0.0075, 0.01)
+HORIZONS = (1, 2, 3)
+FEE_BPS = 10  # Comisión por unidad de posición operada (taker de Binance)
+SLIPPAGE_BPS = 2
+CHUNK_ELEMENTS = 1_000_000  # Umbrales simulados juntos: chunk x n_velas <= esto (acota memoria)
+
+
+def periods_per_year(timeframe):
+    return 365 * 86_400_000 / timeframe_ms(timeframe)
+
+
+def decision_scores(predictions, horizon, n_rows):
+    """
+    Score de entrada por vela: retorno acumulado predicho sobre `horizon` velas.
+    La fila k de las predicciones (ventana data[k:k+10]) decide la posición
+    para las velas 10+k en adelante; el resultado se alinea a las filas del
+    dataset (NaN donde todavía no hay predicción).
+    """
+    steps = predictions.shape[1]
+    scores = np.full(n_rows, np.nan)
+    k = min(len(predictions), n_rows - 10)
+    scores[10:10 + k] = predictions[:k, :min(horizon, steps)].sum(axis=1)
+    return scores
+
+
+def _positions(scores, thresholds, horizon, allow_short):
+    """
+    Posiciones (n_umbrales, n) en [-1, 1]: cada vela abre un tramo de 1/horizon
+    (largo si score > umbral, corto si score < -umbral) que se mantiene
+    `horizon` velas; la posición es la suma de tramos vivos (media móvil de
+    las decisiones, calculada con cumsum).
+    """
+    # Una fila por umbral: todas las operaciones recorren memoria contigua
+    scores = np.nan_to_num(scores)[None, :]
+    thresholds = np.asarray(thresholds)[:, None]
+    decisions = (scores > thresholds).astype(np.int32)
+    if allow_short:
+        decisions -= (scores < -thresholds).astype(np.int32)
+    cumulative = np.cumsum(decisions, axis=1)
+    cumulative[:, horizon:] -= cumulative[:, :-horizon].copy()
+    return cumulative / horizon
+
+
+def _metrics(positions, returns, cost, ppy):
+    """Curvas y métricas vectorizadas por fila de `positions` (n_configs, n)."""
+    turnover = np.abs(np.diff(positions, axis=1, prepend=0))
+    pnl = positions * returns - turnover * cost
+    log_equity = np.cumsum(np.log1p(np.maximum(pnl, -0.999999)), axis=1)
+    # Drawdown en escala log (exp es monótona): se exponencia sólo el mínimo
+    log_drawdown = log_equity - np.maximum.accumulate(np.maximum(log_equity, 0), axis=1)
+
+    std = pnl.std(axis=1)
+    sharpe = np.divide(pnl.mean(axis=1), std, out=np.zeros_like(std), where=std > 0) * np.sqrt(ppy)
+    return {
+        "total_return": np.expm1(log_equity[:, -1]),
+        "sharpe": sharpe,
+        "max_drawdown": np.expm1(log_drawdown.min(axis=1)),
+        "turnover": turnover.mean(axis=1),
+        "exposure": (positions != 0).mean(axis=1),
+        "trades": (turnover > 0).sum(axis=1),
+    }, log_equity
+
+
+def simulate_grid(predictions, returns, timeframe="1m", thresholds=THRESHOLDS, horizons=HORIZONS,
+                  fee_bps=FEE_BPS, slippage_bps=SLIPPAGE_BPS, allow_short=True, start=0, end=None):
+    """
+    Estrategia derivada de las predicciones para cada combinación
+    (horizonte de tenencia, umbral de entrada), sobre las velas [start, end).
+
+    - predictions: salida del motor de evaluación (fila k -> posición k + 10).
+    - returns: columna 'return' del dataset (retorno de cada vela vs la anterior).
+    - Costos: fee + slippage (bps) por unidad de posición operada.
+
+    Retorna un DataFrame con una fila por combinación: total_return, sharpe
+    (anualizado según el timeframe), max_drawdown, turnover medio por vela,
+    exposure y trades.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    end = len(returns) if end is None else end
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    cost = (fee_bps + slippage_bps) / 10_000
+    ppy = periods_per_year(timeframe)
+    # Con 1m (~1M velas) se simula de a un umbral: cada array temporal pesa ~8 MB
+    chunk_size = max(1, min(len(thresholds), CHUNK_ELEMENTS // max(end - start, 1)))
+
+    rows = []
+    for horizon in horizons:
+        scores = decision_scores(predictions, horizon, len(returns))[start:end]
+        for i in range(0, len(thresholds), chunk_size):
+            chunk = thresholds[i:i + chunk_size]
+            metrics, _ = _metrics(_positions(scores, chunk, horizon, allow_short), returns[start:end], cost, ppy)
+            for j, threshold in enumerate(chunk):
+                rows.append({"horizon": horizon, "threshold": threshold, **{m: v[j] for m, v in metrics.items()}})
+    return pd.DataFrame(rows)
+
+
+def equity_curve(predictions, returns, timeframe="1m", threshold=0.0, horizon=1,
+                 fee_bps=FEE_BPS, slippage_bps=SLIPPAGE_BPS, allow_short=True, start=0, end=None):
+    """Curva de equity (arranca en 1) y posiciones de una sola configuración sobre [start, end)."""
+    returns = np.asarray(returns, dtype=np.float64)
+    scores = decision_scores(predictions, horizon, len(returns))[start:end]
+    positions = _positions(scores, np.array([threshold]), horizon, allow_short)
+    _, log_equity = _metrics(positions, returns[start:end], (fee_bps + slippage_bps) / 10_000, periods_per_year(timeframe))
+    return np.exp(log_equity[0]), positions[0]
+
+
+def plot_equity(equity, tf_name="", label="", show_plot=False):
+    os.makedirs("results", exist_ok=True)
+    plt.figure(figsize=(14, 6))
+    plt.plot(equity, label=label or "Estrategia", color="blue")
+    plt.axhline(1.0, color="gray", linestyle="--")
+    plt.title(f"{tf_name} - Equity de la estrategia")
+    plt.xlabel("Vela")
+    plt.ylabel("Equity")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(f"results/pnl_{tf_name}.png")
+    if show_plot:
+        plt.show()
+    plt.close()
+    gc.collect(1)  # Figura en ciclos de referencias: se libera ya
@@ -1,24 +1,111 @@
+import os
 import numpy as np
-from stable_baselines3 import PPO
-from env.candle_env import CandlePredictionEnv
-from stable_baselines3.common.env_util import make_vec_env
+from scripts.features import FEATURE_COLUMNS, build_observations, windows_to_observations
+from scripts.numpy_policy import load_numpy_policy, numpy_policy_path
 
+PREDICT_BATCH_SIZE = 8192
+WINDOW_SIZE = 10
 
-def predict(data, model_path, steps=3, return_only=False):
-    data = data.copy().reset_index(drop=True)
+# Cache de modelos en memoria: ruta -> (mtime del .zip, modelo)
+_model_cache = {}
+
+
+def load_model(model_path):
+    """PPO.load con cache por ruta; se recarga sólo si cambia el mtime del .zip."""
+    # Import diferido: torch/stable_baselines3 sólo se cargan si hace falta el PPO completo
+    from stable_baselines3 import PPO
+
+    zip_path = model_path if model_path.endswith(".zip") else f"{model_path}.zip"
+    mtime = os.path.getmtime(zip_path)
+    cached = _model_cache.get(zip_path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, PPO.load(zip_path))
+        _model_cache[zip_path] = cached
+    return cached[1]
+
+
+def load_policy(model_path):
+    """
+    Política para predecir: la exportada a NumPy (.npz) si está vigente,
+    si no el PPO completo. Ambas exponen predict(obs, deterministic=True).
+    """
+    npz_path = numpy_policy_path(model_path)
+    zip_path = model_path if model_path.endswith(".zip") else f"{model_path}.zip"
+    mtimes = tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in (npz_path, zip_path))
+
+    cached = _model_cache.get(npz_path)
+    if cached is not None and cached[0] == mtimes:
+        return cached[1]
+
+    policy = load_numpy_policy(model_path) if mtimes[0] is not None else None
+    if policy is None:
+        return load_model(model_path)
+    _model_cache[npz_path] = (mtimes, policy)
+    return policy
+
+
+def predict_batch(model, observations, batch_size=PREDICT_BATCH_SIZE):
+    """
+    Corre la política determinística sobre una matriz de observaciones
+    (n, obs_len) en lotes grandes. Retorna las acciones (n, predict_steps).
+    """
+    actions = [
+        model.predict(observations[i:i + batch_size], deterministic=True)[0]
+        for i in range(0, len(observations), batch_size)
+    ]
+    if not actions:
+        shape = model.action_space.shape if hasattr(model, "action_space") else model.action_shape
+        return np.empty((0,) + shape, dtype=np.float32)
+    return np.concatenate(actions)
 
+
+class Predictor:
+    """
+    Sesión de predicción de larga vida para un modelo.
+    El modelo sale del cache en memoria (no se relee el .zip en cada llamada)
+    y las observaciones se arman directo desde arrays, sin entornos ni copias
+    del DataFrame completo.
+    """
+
+    def __init__(self, model_path, feature_columns=FEATURE_COLUMNS, window_size=WINDOW_SIZE):
+        self.model_path = model_path
+        self.feature_columns = list(feature_columns)
+        self.window_size = window_size
+
+    @property
+    def model(self):
+        return load_policy(self.model_path)
+
+    def predict(self, data):
+        """
+        Predicción a partir de un DataFrame de features (como `predict`).
+        Usa la ventana que termina 10 velas antes del final: data[-20:-10].
+        """
+        if len(data) < 2 * self.window_size:
+            raise ValueError(f"❌ Se necesitan al menos {2 * self.window_size} velas para predecir")
+        tail = data.iloc[-2 * self.window_size:-self.window_size]
+        obs = build_observations(tail.values, list(data.columns), self.window_size)
+        return self.model.predict(obs[0], deterministic=True)[0]
+
+    def predict_window(self, window):
+        """Camino rápido: `window` es un ndarray (window_size, n_features) ya recortado."""
+        obs = build_observations(window[-self.window_size:], self.feature_columns, self.window_size)
+        return self.model.predict(obs[0], deterministic=True)[0]
+
+    def predict_many(self, windows):
+        """Varias ventanas (n, window_size, n_features) en una sola pasada -> (n, predict_steps)."""
+        windows = np.asarray(windows, dtype=np.float32)[:, -self.window_size:, :]
+        obs = windows_to_observations(np.ascontiguousarray(windows.transpose(0, 2, 1)), self.feature_columns)
+        return predict_batch(self.model, obs)
+
+
+def predict(data, model_path, steps=3, return_only=False):
     if "return" not in data.columns or "volume" not in data.columns:
         raise ValueError("❌ El dataset debe tener columnas 'return' y 'volume'")
 
     #last_close_prices = data["close"].iloc[-10:].values
 
-    env = CandlePredictionEnv(data, predict_steps=steps)
-    vec_env = make_vec_env(lambda: env, n_envs=1)
-    model = PPO.load(model_path)
-
-    env.position = len(data) - 10
-    obs = env._get_obs()
-    action, _ = model.predict(obs, deterministic=True)
+    action = Predictor(model_path).predict(data)
 
     if return_only:
         return action
@@ -0,0 +1,96 @@
+import os
+import numpy as np
+import pandas as pd
+from scripts.candle_store import COLUMNS, STORE_ROOT, CandleStore, _to_ms, csv_path, timeframe_ms
+
+DERIVED_TIMEFRAMES = ["3m", "5m", "15m", "1h", "1d"]
+
+
+def resample_ohlcv(df, timeframe, drop_partial_head=False):
+    """
+    Agrega velas de 1m (ordenadas) a `timeframe`, con buckets alineados a la
+    época UTC como las velas de Binance: open=primera, high=máx, low=mín,
+    close=última, volume=suma. La última vela puede quedar parcial.
+    """
+    if timeframe.endswith("w"):
+        raise ValueError("❌ Las velas semanales de Binance no están alineadas a la época")
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNS)
+
+    step = timeframe_ms(timeframe)
+    ts = _to_ms(df["timestamp"])
+    buckets = ts - ts % step
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = np.concatenate((starts[1:], [len(ts)])) - 1
+
+    out = pd.DataFrame({
+        "timestamp": pd.to_datetime(buckets[starts], unit="ms"),
+        "open": df["open"].to_numpy(dtype=np.float64)[starts],
+        "high": np.maximum.reduceat(df["high"].to_numpy(dtype=np.float64), starts),
+        "low": np.minimum.reduceat(df["low"].to_numpy(dtype=np.float64), starts),
+        "close": df["close"].to_numpy(dtype=np.float64)[ends],
+        "volume": np.add.reduceat(df["volume"].to_numpy(dtype=np.float64), starts),
+    })
+    # Si la serie de 1m arranca a mitad de un bucket, esa primera vela está incompleta
+    if drop_partial_head and ts[0] != buckets[0]:
+        out = out.iloc[1:].reset_index(drop=True)
+    return out
+
+
+def _drop_last_csv_row(file_path):
+    """Quita la última fila del CSV leyendo sólo el final del archivo."""
+    with open(file_path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        chunk = min(size, 4096)
+        f.seek(size - chunk)
+        tail = f.read(chunk)
+        cut = tail.rstrip(b"\n").rfind(b"\n") + 1
+        if cut > 0:
+            f.truncate(size - chunk + cut)
+
+
+def update_resampled(symbol="PEPE/USDT", timeframe="5m", base_tf="1m", root=STORE_ROOT):
+    """
+    Mantiene un timeframe derivado a partir del almacén de 1m.
+    - Sin datos: se arma completo desde todo el histórico de 1m.
+    - Con datos: se re-agrega sólo desde el inicio de la última vela guardada
+      (que puede haber quedado parcial); esa vela se reemplaza y se agregan
+      las nuevas. Lo mismo con el CSV espejo.
+    Retorna cuántas velas nuevas hay (sin contar la reemplazada).
+    """
+    base = CandleStore(symbol, base_tf, root=root)
+    store = CandleStore(symbol, timeframe, root=root)
+    file_path = csv_path(symbol, timeframe)
+    last_ms = store.last_timestamp()
+
+    if last_ms is None:
+        bars = resample_ohlcv(base.read(), timeframe, drop_partial_head=True)
+        store.append(bars)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        bars.to_csv(file_path, index=False)
+        print(f"🧮 {timeframe} armado desde {base_tf}: {len(bars)} velas")
+        return len(bars)
+
+    bars = resample_ohlcv(base.read(start=pd.to_datetime(last_ms, unit="ms")), timeframe)
+    replaced = not bars.empty and _to_ms(bars["timestamp"].iloc[:1])[0] == last_ms
+    if replaced:
+        store.truncate(last_ms - 1)
+        if os.path.exists(file_path):
+            _drop_last_csv_row(file_path)
+    added = store.append(bars)
+
+    if os.path.exists(file_path):
+        bars.tail(added).to_csv(file_path, mode="a", header=False, index=False)
+    else:
+        store.read().to_csv(file_path, index=False)
+
+    new_bars = added - replaced
+    if new_bars:
+        print(f"🧮 {timeframe} actualizado desde {base_tf}. Última vela: {bars['timestamp'].iloc[-1]}")
+    else:
+        print(f"✅ {timeframe} al día (última vela recalculada desde {base_tf})")
+    return new_bars
+
+
+def update_resampled_timeframes(symbol="PEPE/USDT", timeframes=DERIVED_TIMEFRAMES, base_tf="1m", root=STORE_ROOT):
+    return {tf: update_resampled(symbol, tf, base_tf, root=root) for tf in timeframes}
@@ -0,0 +1,226 @@
+import contextlib
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows: sin getrusage (CPU sólo del proceso, sin RSS)
+    resource = None
+
+SPANS_PATH = "logs/spans.jsonl"
+PROMETHEUS_PATH = "logs/metrics.prom"
+# ru_maxrss viene en KB en Linux y en bytes en macOS
+_RSS_DIVISOR = 1024 * 1024 if sys.platform == "darwin" else 1024
+
+
+class _NullSpan:
+    """Span deshabilitado: no mide nada (costo de un with vacío)."""
+
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _cpu_seconds():
+    if resource is None:
+        return time.process_time()
+    # CPU del proceso + procesos hijos ya terminados (workers de entrenamiento)
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None, None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / _RSS_DIVISOR
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / _RSS_DIVISOR
+    return own, children
+
+
+@contextlib.contextmanager
+def measure():
+    """
+    Mide un bloque sin registrarlo (p. ej. dentro de un worker, que no tiene
+    recorder): al salir, el dict tiene start, wall_s, cpu_s y los picos de RSS
+    con los mismos campos que un span. Se registra después con record().
+    """
+    measured = {"start": datetime.now().isoformat(timespec="milliseconds")}
+    cpu0 = _cpu_seconds()
+    t0 = time.perf_counter()
+    try:
+        yield measured
+    finally:
+        rss, children_rss = _peak_rss_mb()
+        measured.update({
+            "wall_s": round(time.perf_counter() - t0, 6),
+            "cpu_s": round(_cpu_seconds() - cpu0, 6),
+            "peak_rss_mb": rss and round(rss, 1),
+            "peak_rss_children_mb": children_rss and round(children_rss, 1),
+        })
+
+
+class _Span:
+    def __init__(self, recorder, name, attrs):
+        self.recorder = recorder
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.parent = self.recorder._stack[-1] if self.recorder._stack else None
+        self.depth = len(self.recorder._stack)
+        self.recorder._stack.append(self.name)
+        self.seq = self.recorder._opened
+        self.recorder._opened += 1
+        self.started = datetime.now().isoformat(timespec="milliseconds")
+        self.cpu0 = _cpu_seconds()
+        self.t0 = time.perf_counter()
+        return self.attrs
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.t0
+        cpu = _cpu_seconds() - self.cpu0
+        rss, children_rss = _peak_rss_mb()
+        self.recorder._stack.pop()
+        self.recorder._write({
+            "run_id": self.recorder.run_id,
+            "seq": self.seq,
+            "span": self.name,
+            "parent": self.parent,
+            "depth": self.depth,
+            **self.attrs,
+            "start": self.started,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_rss_mb": rss and round(rss, 1),
+            "peak_rss_children_mb": children_rss and round(children_rss, 1),
+            "status": "error" if exc_type else "ok",
+        })
+        return False
+
+
+class SpanRecorder:
+    """
+    Spans estructurados por paso/timeframe: tiempo de pared, tiempo de CPU,
+    pico de RSS (del proceso y de sus hijos) y los atributos que agregue el
+    código medido (p. ej. rows). Cada span cerrado se agrega como una línea
+    JSON a `path`; los spans se pueden anidar (campo parent).
+
+        with span("features", timeframe="1m") as s:
+            df = prepare_data(df)
+            s["rows"] = len(df)
+    """
+
+    def __init__(self, path=SPANS_PATH, run_id=None):
+        self.path = path
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.records = []
+        self._stack = []
+        self._opened = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", buffering=1)
+
+    def span(self, name, **attrs):
+        return _Span(self, name, attrs)
+
+    def record(self, name, measured, attrs):
+        """Registra un span ya medido (measure()) como hijo del span abierto."""
+        self._write({
+            "run_id": self.run_id,
+            "seq": self._opened,
+            "span": name,
+            "parent": self._stack[-1] if self._stack else None,
+            "depth": len(self._stack),
+            **attrs,
+            **measured,
+            "status": "ok",
+        })
+        self._opened += 1
+
+    def _write(self, record):
+        self.records.append(record)
+        self._file.write(json.dumps(record, default=str) + "\n")
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def write_prometheus(self, path=PROMETHEUS_PATH):
+        """Snapshot en formato de texto de Prometheus (gauges por span y timeframe)."""
+        metrics = {
+            "wall_seconds": ("wall_s", "Tiempo de pared del span"),
+            "cpu_seconds": ("cpu_s", "Tiempo de CPU (proceso + hijos) del span"),
+            "peak_rss_megabytes": ("peak_rss_mb", "Pico de RSS del proceso al cerrar el span"),
+            "rows": ("rows", "Filas procesadas por el span"),
+        }
+        lines = []
+        for metric, (field, help_text) in metrics.items():
+            name = f"pipeline_span_{metric}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for r in self.records:
+                if r.get(field) is None:
+                    continue
+                labels = {"span": r["span"], "run_id": self.run_id}
+                for key in ("timeframe", "vela"):
+                    if r.get(key) is not None:
+                        labels[key] = r[key]
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {r[field]}")
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+        return path
+
+    def summary(self):
+        """Tabla de texto: una fila por span (en orden de apertura) con tiempos, RSS y filas."""
+        lines = [f"{'span':<28}{'tf':>6}{'pared s':>10}{'cpu s':>10}{'rss MB':>10}{'filas':>12}"]
+        for r in sorted(self.records, key=lambda r: r["seq"]):
+            indent = "  " * r["depth"]
+            rows = f"{r['rows']:>12,}" if r.get("rows") is not None else f"{'-':>12}"
+            lines.append(
+                f"{indent + r['span']:<28}{r.get('timeframe') or '-':>6}{r['wall_s']:>10.2f}"
+                f"{r['cpu_s']:>10.2f}{r['peak_rss_mb'] or 0:>10.0f}{rows}"
+            )
+        return "\n".join(lines)
+
+
+# Recorder activo del proceso (como logging: se configura una vez en main)
+_recorder = None
+
+
+def configure(path=SPANS_PATH, enabled=True, run_id=None):
+    """Activa (o desactiva) el registro de spans para todo el proceso."""
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+    _recorder = SpanRecorder(path, run_id) if enabled else None
+    return _recorder
+
+
+def span(name, **attrs):
+    """Span sobre el recorder activo; sin configurar es un no-op."""
+    if _recorder is None:
+        return _NULL_SPAN
+    return _recorder.span(name, **attrs)
+
+
+def record(name, measured, **attrs):
+    """Registra en el recorder activo un span medido en otro proceso; sin configurar es un no-op."""
+    if _recorder is not None:
+        _recorder.record(name, measured, attrs)
+
+
+def recorder():
+    return _recorder
@@ -0,0 +1,156 @@
+import threading
+from collections import OrderedDict, deque
+import numpy as np
+from scripts.backfill import classify_batch
+from scripts.predict import Predictor
+
+CHUNK_ROWS = 2048  # Velas del timeframe por bloque de predicciones
+MAX_CHUNKS = 512  # Bloques en memoria (LRU)
+
+
+class PredictionTimeline:
+    """
+    Predicciones y patrones precalculados para las GUIs de navegación.
+
+    La predicción de un timeframe en un minuto dado sólo depende de cuántas
+    velas del timeframe hay hasta ese minuto (n_rows: ventana [n-20, n-10),
+    igual que predict()). Por eso se cachea por (tf, bloque de n_rows) y cada
+    minuto de la vista se resuelve con un gather sobre arrays ya calculados.
+
+    Los bloques se calculan en un hilo de fondo; lo pedido por la vista actual
+    va primero y lo prefetch después. Sólo los matmul (BLAS) sueltan el GIL,
+    el resto de la inferencia compite con Tk, por eso se calcula de a un bloque
+    chico. La GUI nunca espera: lookup() devuelve lo que haya y avisa si falta.
+    """
+
+    def __init__(self, engines, model_paths, chunk_rows=CHUNK_ROWS, max_chunks=MAX_CHUNKS):
+        self.engines = engines
+        self.predictors = {tf: Predictor(path) for tf, path in model_paths.items()}
+        self.chunk_rows = chunk_rows
+        self.max_chunks = max_chunks
+        self._chunks = OrderedDict()  # (tf, bloque) -> (preds, patterns)
+        self._queue = deque()
+        self._queued = set()
+        self._cond = threading.Condition()
+        self._waiter = None  # (bloques, callback) esperando en la GUI
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    # ---------- cálculo ----------
+    def _compute(self, tf, chunk):
+        engine = self.engines[tf]
+        lo = chunk * self.chunk_rows
+        n_rows = np.arange(lo, lo + self.chunk_rows)
+        valid = (n_rows >= 20) & (n_rows <= len(engine))
+
+        preds = np.full((self.chunk_rows, 3), np.nan, dtype=np.float32)
+        patterns = np.zeros(self.chunk_rows, dtype=np.int64)
+        if valid.any():
+            starts = n_rows[valid] - 20
+            windows = engine.feature_values()[starts[:, None] + np.arange(10)]
+            preds[valid] = self.predictors[tf].predict_many(windows)[:, :3]
+            patterns[valid] = classify_batch(preds[valid])
+        return preds, patterns
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                key = self._queue.popleft()
+            if key not in self._chunks:
+                try:
+                    result = self._compute(*key)
+                except Exception as e:
+                    # Se cachea vacío para que la GUI no quede esperando el bloque
+                    print(f"❌ Error calculando predicciones {key}: {e}")
+                    result = (np.full((self.chunk_rows, 3), np.nan, dtype=np.float32),
+                              np.zeros(self.chunk_rows, dtype=np.int64))
+                with self._cond:
+                    self._chunks[key] = result
+                    while len(self._chunks) > self.max_chunks:
+                        self._chunks.popitem(last=False)
+            with self._cond:
+                self._queued.discard(key)
+                self._cond.notify_all()
+
+    def _schedule(self, keys, urgent):
+        with self._cond:
+            for key in (reversed(keys) if urgent else keys):
+                if key in self._chunks:
+                    continue
+                if key in self._queue:
+                    if not urgent:
+                        continue
+                    self._queue.remove(key)  # Pasa al frente
+                elif key in self._queued:
+                    continue  # Ya se está calculando
+                self._queued.add(key)
+                if urgent:
+                    self._queue.appendleft(key)
+                else:
+                    self._queue.append(key)
+            self._cond.notify_all()
+
+    # ---------- consultas ----------
+    def lookup(self, tf, n_rows):
+        """
+        Predicciones (k, 3) float32 (NaN si no hay o no están listas),
+        patrones (k,) int y la lista de bloques que faltan (vacía si estaba
+        todo calculado). Lo que falta se encola con prioridad.
+        """
+        n_rows = np.asarray(n_rows, dtype=np.int64)
+        preds = np.full((len(n_rows), 3), np.nan, dtype=np.float32)
+        patterns = np.zeros(len(n_rows), dtype=np.int64)
+        chunk_ids = n_rows // self.chunk_rows
+        missing = []
+        with self._cond:
+            for tf_chunk in np.unique(chunk_ids):
+                cached = self._chunks.get((tf, int(tf_chunk)))
+                if cached is None:
+                    missing.append((tf, int(tf_chunk)))
+                    continue
+                self._chunks.move_to_end((tf, int(tf_chunk)))
+                rows = chunk_ids == tf_chunk
+                offsets = n_rows[rows] - tf_chunk * self.chunk_rows
+                preds[rows] = cached[0][offsets]
+                patterns[rows] = cached[1][offsets]
+        if missing:
+            self._schedule(missing, urgent=True)
+        return preds, patterns, missing
+
+    def prefetch(self, tf, n_lo, n_hi):
+        """Encola (sin prioridad) los bloques que cubren n_rows en [n_lo, n_hi]."""
+        n_lo = max(int(n_lo), 0)
+        n_hi = min(int(n_hi), len(self.engines[tf]))
+        chunks = range(n_lo // self.chunk_rows, n_hi // self.chunk_rows + 1)
+        self._schedule([(tf, c) for c in chunks], urgent=False)
+
+    def missing(self, keys):
+        with self._cond:
+            return [key for key in keys if key not in self._chunks]
+
+    def ready(self, keys):
+        return not self.missing(keys)
+
+    def when_ready(self, widget, keys, callback, interval_ms=100):
+        """
+        Llama `callback` en el hilo de Tk cuando estén calculados los bloques
+        `keys`. Un solo aviso pendiente: uno nuevo reemplaza al anterior.
+        Si el LRU desalojó un bloque esperado antes de que se lo viera, se
+        vuelve a encolar con prioridad (si ya está en cola no se duplica).
+        """
+        def poll():
+            keys, callback = self._waiter
+            missing = self.missing(keys)
+            if not missing:
+                self._waiter = None
+                callback()
+            else:
+                self._schedule(missing, urgent=True)
+                widget.after(interval_ms, poll)
+
+        pending = self._waiter is not None
+        self._waiter = (keys, callback)
+        if not pending:
+            widget.after(interval_ms, poll)
@@ -0,0 +1,83 @@
+import logging
+import logging.handlers
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from scripts.features import split_point
+from scripts.spans import measure, record
+
+
+def _init_worker(log_queue, torch_threads):
+    # Limitar hilos ANTES de importar torch para no sobresuscribir la CPU
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(torch_threads)
+    import torch
+    torch.set_num_threads(torch_threads)
+
+    # Todo lo que loguee el worker viaja por la cola al proceso principal
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(logging.INFO)
+
+
+def _train_timeframe(tf, data, model_path, n_envs):
+    # Import diferido: stable_baselines3/torch se cargan ya con los hilos limitados
+    from scripts.agent import train_agent, LogProgressCallback, TOTAL_TIMESTEPS
+
+    # El worker no tiene recorder de spans: mide y devuelve, el principal registra
+    with measure() as measured:
+        logging.info(f"🧠 Entrenando modelo para {tf}...")
+        callback = LogProgressCallback(tf, TOTAL_TIMESTEPS)
+        train_agent(data, model_path, n_envs=n_envs, callback=callback)
+    logging.info(f"✅ Modelo entrenado para {tf} en {measured['wall_s']:.1f}s")
+    return tf, measured
+
+
+def train_timeframes_parallel(jobs, max_workers=None, n_envs=1):
+    """
+    Entrena varios timeframes a la vez en un pool de procesos.
+    - jobs: dict {tf: (dataframe, model_path)}
+    - Cada worker usa cpu_count // workers hilos de torch.
+    - Los logs de los workers se reenvían a los handlers del proceso principal
+      (logs/log.txt + consola).
+    - Cada timeframe terminado agrega un span "entrenamiento" (tiempos y RSS
+      medidos en su worker) como hijo del span abierto en el proceso principal.
+
+    Retorna un dict {tf: test_df}: el 20% final como vista de los datos del
+    proceso principal (el worker no devuelve una copia serializada).
+    """
+    if not jobs:
+        return {}
+
+    cpu_count = os.cpu_count() or 1
+    max_workers = max_workers or min(len(jobs), cpu_count)
+    torch_threads = max(1, cpu_count // max_workers)
+
+    ctx = mp.get_context("spawn")
+    log_queue = ctx.Queue()
+    listener = logging.handlers.QueueListener(
+        log_queue, *logging.getLogger().handlers, respect_handler_level=True
+    )
+    listener.start()
+
+    test_dataframes = {}
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(log_queue, torch_threads),
+        ) as executor:
+            futures = [
+                executor.submit(_train_timeframe, tf, data, model_path, n_envs)
+                for tf, (data, model_path) in jobs.items()
+            ]
+            for future in as_completed(futures):
+                tf, measured = future.result()
+                data = jobs[tf][0]
+                record("entrenamiento", measured, timeframe=tf, rows=len(data))
+                test_dataframes[tf] = data.iloc[split_point(len(data)):]
+    finally:
+        listener.stop()
+
+    return test_dataframes
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from scripts.benchmark import synthetic_ohlcv
+from scripts.candle_store import read_candles_csv
+
+
+@pytest.fixture(scope="module")
+def csv_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("csv") / "PEPEUSDT_1m.csv"
+    synthetic_ohlcv(20_000).to_csv(path, index=False)
+    return path
+
+
+def test_range_reads_match_filtered_full_read(csv_file):
+    # Bloques de búsqueda chicos: los bordes caen en muchos offsets distintos
+    # (a mitad de línea, justo en el salto de línea, en la última vela, ...)
+    full = read_candles_csv(csv_file)  # También escribe la caché
+    ts = full["timestamp"]
+    rng = np.random.default_rng(0)
+    for k in range(200):
+        a = int(rng.integers(0, len(full)))
+        b = min(a + int(rng.integers(0, 2000)), len(full) - 1)
+        start, end = ts.iloc[a], ts.iloc[b]
+        expected = full[(ts >= start) & (ts <= end)].reset_index(drop=True)
+        # La caché se relee entera en cada llamada: se verifica en una de cada 10
+        for cache in ((False, True) if k % 10 == 0 else (False,)):
+            got = read_candles_csv(csv_file, start=start, end=end, cache=cache, block_bytes=32)
+            assert got.equals(expected), f"rango [{start}, {end}] cache={cache}: {len(got)} filas, se esperaban {len(expected)}"
+
+
+def test_range_read_keeps_last_candle(csv_file):
+    full = read_candles_csv(csv_file, cache=False)
+    last = full["timestamp"].iloc[-1]
+    for block_bytes in (32, 1000, 1 << 16):
+        got = read_candles_csv(csv_file, start=full["timestamp"].iloc[-5], end=last, cache=False, block_bytes=block_bytes)
+        assert got.equals(full.iloc[-5:].reset_index(drop=True))